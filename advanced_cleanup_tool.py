@@ -34,7 +34,9 @@ class AdvancedCleanupTool:
             'YouTube_Downloader_logo.ico',  # 图标文件 - 重要，不能删
             '2025-09-05.jpg',        # 程序截图 - 重要，不能删
             'pack_silent_optimized.bat',    # 核心打包脚本
-            'history.json',          # 下载历史数据
+            'history.json',          # 下载历史数据（旧版）
+            'history.db',            # 下载历史数据
+            'cli.py',                # 命令行入口
             'config.json',           # 配置数据
         }
         
@@ -43,6 +45,7 @@ class AdvancedCleanupTool:
             'strategies',    # 下载策略
             'utils',         # 工具模块
             'components',    # 组件库 (保留但可精简)
+            'history_archive',  # 下载历史归档
         }
         
         # 按类别分类的冗余文件
@@ -71,9 +74,6 @@ class AdvancedCleanupTool:
                 'gui_sensitive_cleanup_tool.py': '旧版敏感信息清理工具',
                 'update_tools.bat': '工具更新脚本（项目完成后无需）',
             },
-            'temp_files': {
-                'utils/progress.py': '空的进度条模块文件',
-            },
             'virtual_env': {
                 'clean_env/': 'Python虚拟环境目录（已手动删除，释放40.4MB）',
             }
@@ -174,6 +174,13 @@ class AdvancedCleanupTool:
             self.log_action("移动失败", f"{file_path.name}: {e}")
             return False
 
+    def is_protected(self, relative_path):
+        """核心文件，以及核心目录中的 Python 模块（被程序导入，不能移走）"""
+        path = Path(relative_path)
+        if path.name in self.core_files:
+            return True
+        return path.parts[0] in self.core_dirs and path.suffix == '.py'
+
     def log_action(self, action, details=""):
         """记录清理操作"""
         log_entry = f"[精简] {action}"
@@ -194,7 +201,7 @@ class AdvancedCleanupTool:
                 
                 if file_path.exists():
                     # 双重检查：确保不删除重要文件
-                    if filename in ['YouTube_Downloader_logo.ico', '2025-09-05.jpg']:
+                    if filename in ['YouTube_Downloader_logo.ico', '2025-09-05.jpg'] or self.is_protected(filename):
                         self.log_action("跳过重要文件", f"保留: {filename}")
                         continue
                         
@@ -249,7 +256,7 @@ class AdvancedCleanupTool:
                     continue
                 
                 # 确保不删除重要文件
-                if file_path.name in self.core_files:
+                if self.is_protected(file_path.relative_to(self.project_root)):
                     continue
                     
                 if self.safe_delete_file(file_path, 'empty_files', '空文件，无内容'):
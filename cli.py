@@ -0,0 +1,203 @@
+"""
+命令行下载入口（无界面，不依赖 tkinter）
+
+用法示例：
+    python cli.py https://www.youtube.com/watch?v=xxxxxxxxxxx
+    python cli.py -f mp3 -i urls.txt -o ~/Music -j 4
+    cat urls.txt | python cli.py -f m4a
+    python cli.py --serve --port 8765
+
+stdout 每行输出一个 JSON 事件（job / progress / summary），日志写到 stderr。
+--serve 模式启动本地 HTTP 接口（见 utils/api_server.py），持续接收任务。
+"""
+import asyncio
+import argparse
+import json
+import os
+import sys
+import threading
+
+from config import (load_config, app_path, DEFAULT_DOWNLOAD_DIR, DEFAULT_RATE_LIMIT_KB, DEFAULT_METRICS_DIR,
+                    DEFAULT_FLUSH_INTERVAL_MS, DEFAULT_FLUSH_MAX_RECORDS)
+from strategies.factory import DOWNLOAD_TYPES
+from utils.api_server import DownloadServer
+from utils.archive import ARCHIVE_POLICIES
+from utils.dedupe import DEDUPE_MODES
+from utils.engine import DownloadEngine
+from utils.history import flush_history
+from utils.metrics import MetricsRecorder
+from utils.progress import ProgressAggregator
+from utils.ratelimit import get_limiter
+from utils.scheduler import DONE, FAILED
+from utils.transcode import get_transcode_pool
+from utils.ydl_pool import get_pool
+
+
+class JsonLinesWriter:
+    """线程安全地向 stdout 输出 JSON Lines 事件"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps(dict(event=event, **fields), ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+def iter_urls(args):
+    """依次生成命令行参数、输入文件和 stdin 中的链接（忽略空行和 # 注释）"""
+    sources = list(args.input or [])
+    if not args.urls and not sources and not sys.stdin.isatty():
+        sources.append('-')
+    for url in args.urls:
+        yield url.strip()
+    for source in sources:
+        # stdin 逐行读取，上游每写入一行就立即提交
+        f = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+        try:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="YouTube 视频下载器（命令行）")
+    parser.add_argument('urls', nargs='*', help="视频、播放列表或频道链接")
+    parser.add_argument('-f', '--format', choices=DOWNLOAD_TYPES, default='mp4', help="下载格式（默认 mp4）")
+    parser.add_argument('-i', '--input', action='append', metavar='FILE',
+                        help="从文件读取链接，每行一个；'-' 表示 stdin（可重复）")
+    parser.add_argument('-o', '--output-dir', help="输出目录（默认取配置中的下载目录）")
+    parser.add_argument('-j', '--workers', type=int, help="并发下载数")
+    parser.add_argument('--per-host', type=int, help="单个主机的最大并发数")
+    parser.add_argument('--rate-limit', type=int, metavar='KB', help="全局限速（KB/s，0 表示不限速）")
+    parser.add_argument('--thumbnail', action='store_true', help="同时下载封面")
+    parser.add_argument('--archive-policy', choices=ARCHIVE_POLICIES,
+                        help="历史记录中已下载的视频：skip 跳过 / verify 校验大小后跳过 / force 重新下载")
+    parser.add_argument('--dedupe', choices=DEDUPE_MODES,
+                        help="内容与已下载文件相同时：off 不检查 / hardlink 改为硬链接 / skip 删除新文件")
+    parser.add_argument('--progress-interval', type=float, default=1.0, metavar='SECONDS',
+                        help="进度事件的最小输出间隔（默认 1 秒）")
+    parser.add_argument('--serve', action='store_true', help="启动本地 HTTP 任务接口")
+    parser.add_argument('--host', default='127.0.0.1', help="HTTP 接口监听地址（默认 127.0.0.1）")
+    parser.add_argument('--port', type=int, default=8765, help="HTTP 接口端口（默认 8765）")
+    return parser.parse_args(argv)
+
+
+def log(message, color=None):
+    print(message, file=sys.stderr, flush=True)
+
+
+def configure_limiter(config, rate_limit_kb=None):
+    """按配置设置全局限速，命令行指定的限速优先（同时忽略分时段规则）"""
+    limiter = get_limiter()
+    if rate_limit_kb is None:
+        limiter.set_limit(config.get("rate_limit", DEFAULT_RATE_LIMIT_KB) * 1024)
+        limiter.set_schedule([
+            dict(rule, limit=rule.get("limit", 0) * 1024)
+            for rule in config.get("rate_limit_schedule", [])
+            if isinstance(rule, dict)
+        ])
+    else:
+        limiter.set_limit(rate_limit_kb * 1024)
+
+
+def serve(args, config, download_dir, metrics):
+    """运行 HTTP 任务接口直到被中断"""
+    def engine_factory(progress_callback, on_update):
+        return DownloadEngine(download_dir, config, progress_callback=progress_callback,
+                              on_update=on_update, log=log, max_workers=args.workers,
+                              per_host_limit=args.per_host, metrics=metrics,
+                              archive_policy=args.archive_policy, dedupe=args.dedupe)
+
+    server = DownloadServer(engine_factory, args.host, args.port, metrics=metrics)
+    log(f"[信息] HTTP 接口已启动: http://{args.host}:{args.port}/jobs")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        log("[信息] 已停止")
+    finally:
+        get_pool().close()
+        get_transcode_pool().shutdown()
+        flush_history()
+        metrics.close()
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = load_config()
+    download_dir = os.path.abspath(os.path.expanduser(
+        args.output_dir or config.get("download_dir", DEFAULT_DOWNLOAD_DIR)))
+    os.makedirs(download_dir, exist_ok=True)
+    configure_limiter(config, args.rate_limit)
+    metrics = MetricsRecorder(
+        app_path(config.get("metrics_dir", DEFAULT_METRICS_DIR)),
+        flush_interval_ms=config.get("flush_interval_ms", DEFAULT_FLUSH_INTERVAL_MS),
+        flush_max_records=config.get("flush_max_records", DEFAULT_FLUSH_MAX_RECORDS))
+    if args.serve:
+        return serve(args, config, download_dir, metrics)
+
+    writer = JsonLinesWriter()
+    aggregator = ProgressAggregator()
+
+    def on_update(job):
+        writer.emit('job', **job.to_dict())
+
+    engine = DownloadEngine(
+        download_dir, config,
+        progress_callback=aggregator.update,
+        on_update=on_update,
+        log=log,
+        max_workers=args.workers,
+        per_host_limit=args.per_host,
+        metrics=metrics,
+        archive_policy=args.archive_policy,
+        dedupe=args.dedupe,
+    )
+
+    # 进度事件按固定间隔合并输出
+    stop = threading.Event()
+
+    def emit_progress():
+        while not stop.wait(max(0.1, args.progress_interval)):
+            for job, record in aggregator.drain().items():
+                if job.state not in (DONE, FAILED):
+                    writer.emit('progress', job=job.job_id, **record.to_dict())
+
+    ticker = threading.Thread(target=emit_progress, name="progress-ticker", daemon=True)
+    ticker.start()
+
+    engine.start()
+    try:
+        try:
+            for url in iter_urls(args):
+                if not engine.submit(url, args.format, thumbnail=args.thumbnail):
+                    log(f"[批量] 跳过重复链接: {url}")
+        finally:
+            engine.close()
+        engine.wait()
+    except KeyboardInterrupt:
+        log("[信息] 已中断，取消尚未开始的任务")
+        engine.cancel()
+        return 130
+    finally:
+        stop.set()
+        get_pool().close()
+        get_transcode_pool().shutdown()
+        flush_history()
+        metrics.close()
+
+    counts = engine.counts()
+    writer.emit('summary', counts=counts, total=len(engine.jobs))
+    return 1 if counts[FAILED] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
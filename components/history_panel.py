@@ -0,0 +1,177 @@
+# 下载历史浏览窗口
+# 功能: 按时间、格式、频道和标题筛选下载历史，分页显示，点击表头排序
+
+import os
+import subprocess
+import sys
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from strategies.factory import DOWNLOAD_TYPES
+from utils.history import query_history, get_history
+from utils.progress import format_size
+
+PAGE_SIZE = 50
+
+# 列: (标识, 标题, 宽度, 排序字段)
+COLUMNS = (
+    ("timestamp", "时间", 130, "timestamp"),
+    ("title", "标题", 220, "title"),
+    ("format", "格式", 50, "format"),
+    ("uploader", "频道", 110, "uploader"),
+    ("size", "大小", 75, "size"),
+)
+
+
+class HistoryPanel(tk.Toplevel):
+    """
+    下载历史浏览窗口
+
+    每次只查询当前页的记录（数据库按条件过滤、排序和分页），
+    历史再多也不需要把全部记录读入内存。双击一行打开文件所在目录。
+    """
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("下载历史")
+        self.geometry("640x460")
+        self.configure(bg="#f8f9fa")
+
+        self.page = 0
+        self.total = 0
+        self.sort = "timestamp"
+        self.descending = True
+        self._entries = {}
+
+        # 筛选条件
+        filter_frame = tk.Frame(self, bg="#f8f9fa")
+        filter_frame.pack(fill="x", padx=10, pady=(10, 4))
+
+        self.start_var = tk.StringVar()
+        self.end_var = tk.StringVar()
+        self.format_var = tk.StringVar(value="全部")
+        self.uploader_var = tk.StringVar()
+        self.title_var = tk.StringVar()
+        self.archived_var = tk.BooleanVar(value=False)
+
+        tk.Label(filter_frame, text="从", bg="#f8f9fa", font=("Arial", 9)).grid(row=0, column=0, sticky="w")
+        tk.Entry(filter_frame, textvariable=self.start_var, width=11).grid(row=0, column=1, padx=(2, 6))
+        tk.Label(filter_frame, text="到", bg="#f8f9fa", font=("Arial", 9)).grid(row=0, column=2, sticky="w")
+        tk.Entry(filter_frame, textvariable=self.end_var, width=11).grid(row=0, column=3, padx=(2, 6))
+        tk.Label(filter_frame, text="格式", bg="#f8f9fa", font=("Arial", 9)).grid(row=0, column=4, sticky="w")
+        ttk.Combobox(filter_frame, textvariable=self.format_var, values=("全部",) + DOWNLOAD_TYPES,
+                     state="readonly", width=6).grid(row=0, column=5, padx=(2, 6))
+
+        tk.Label(filter_frame, text="频道", bg="#f8f9fa", font=("Arial", 9)).grid(row=1, column=0, sticky="w", pady=(4, 0))
+        ttk.Combobox(filter_frame, textvariable=self.uploader_var, values=[""] + get_history().uploaders(),
+                     width=20).grid(row=1, column=1, columnspan=3, sticky="we", padx=(2, 6), pady=(4, 0))
+        tk.Label(filter_frame, text="标题", bg="#f8f9fa", font=("Arial", 9)).grid(row=1, column=4, sticky="w", pady=(4, 0))
+        title_entry = tk.Entry(filter_frame, textvariable=self.title_var, width=18)
+        title_entry.grid(row=1, column=5, columnspan=2, sticky="we", padx=(2, 6), pady=(4, 0))
+        title_entry.bind("<Return>", lambda e: self.search())
+
+        tk.Button(filter_frame, text="🔍 查询", command=self.search, font=("Arial", 9),
+                  bg="#007bff", fg="white", relief="flat", padx=10,
+                  cursor="hand2").grid(row=0, column=6, rowspan=1, padx=(4, 0))
+        tk.Label(filter_frame, text="日期格式: YYYY-MM-DD", bg="#f8f9fa", fg="#6c757d",
+                 font=("Arial", 8)).grid(row=2, column=0, columnspan=4, sticky="w", pady=(2, 0))
+        # 归档记录需要解压读取，默认只查询近期记录
+        tk.Checkbutton(filter_frame, text="包含归档", variable=self.archived_var, command=self.search,
+                       bg="#f8f9fa", font=("Arial", 9)).grid(row=2, column=4, columnspan=2, sticky="w", pady=(2, 0))
+
+        # 结果表格
+        table_frame = tk.Frame(self, bg="#f8f9fa")
+        table_frame.pack(fill="both", expand=True, padx=10, pady=4)
+        self.tree = ttk.Treeview(table_frame, columns=[c[0] for c in COLUMNS], show="headings")
+        for name, heading, width, sort_field in COLUMNS:
+            self.tree.heading(name, text=heading, command=lambda f=sort_field: self.sort_by(f))
+            self.tree.column(name, width=width, anchor="w", stretch=(name == "title"))
+        self.tree.pack(side=tk.LEFT, fill="both", expand=True)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.bind("<Double-1>", self.open_location)
+
+        # 分页
+        page_frame = tk.Frame(self, bg="#f8f9fa")
+        page_frame.pack(fill="x", padx=10, pady=(4, 10))
+        self.prev_button = tk.Button(page_frame, text="◀ 上一页", command=lambda: self.goto(self.page - 1),
+                                     font=("Arial", 9), relief="flat", bg="#6c757d", fg="white")
+        self.prev_button.pack(side=tk.LEFT)
+        self.page_label = tk.Label(page_frame, text="", bg="#f8f9fa", font=("Arial", 9))
+        self.page_label.pack(side=tk.LEFT, expand=True)
+        self.next_button = tk.Button(page_frame, text="下一页 ▶", command=lambda: self.goto(self.page + 1),
+                                     font=("Arial", 9), relief="flat", bg="#6c757d", fg="white")
+        self.next_button.pack(side=tk.RIGHT)
+
+        self.search()
+
+    def filters(self):
+        format_type = self.format_var.get()
+        return {
+            "start": self.start_var.get().strip() or None,
+            "end": self.end_var.get().strip() or None,
+            "format_type": None if format_type == "全部" else format_type,
+            "uploader": self.uploader_var.get().strip() or None,
+            "title": self.title_var.get().strip() or None,
+            "include_archived": self.archived_var.get(),
+        }
+
+    def search(self):
+        self.page = 0
+        self.refresh()
+
+    def sort_by(self, field):
+        # 再次点击同一列时切换升降序
+        if field == self.sort:
+            self.descending = not self.descending
+        else:
+            self.sort, self.descending = field, field in ("timestamp", "size")
+        self.refresh()
+
+    def goto(self, page):
+        pages = max(1, -(-self.total // PAGE_SIZE))
+        if 0 <= page < pages:
+            self.page = page
+            self.refresh()
+
+    def refresh(self):
+        try:
+            entries, self.total = query_history(sort=self.sort, descending=self.descending,
+                                                limit=PAGE_SIZE, offset=self.page * PAGE_SIZE,
+                                                **self.filters())
+        except Exception as e:
+            messagebox.showerror("错误", f"查询历史记录失败: {e}", parent=self)
+            return
+        self.tree.delete(*self.tree.get_children())
+        self._entries = {}
+        for entry in entries:
+            item = self.tree.insert("", tk.END, values=(
+                entry.get("timestamp", ""),
+                entry.get("title", ""),
+                entry.get("format", ""),
+                entry.get("uploader", ""),
+                format_size(entry["size"]) if entry.get("size") is not None else "",
+            ))
+            self._entries[item] = entry
+        pages = max(1, -(-self.total // PAGE_SIZE))
+        self.page_label.config(text=f"第 {self.page + 1}/{pages} 页，共 {self.total} 条")
+        self.prev_button.config(state=tk.NORMAL if self.page > 0 else tk.DISABLED)
+        self.next_button.config(state=tk.NORMAL if self.page + 1 < pages else tk.DISABLED)
+
+    def open_location(self, event):
+        item = self.tree.identify_row(event.y)
+        entry = self._entries.get(item)
+        if not entry or not entry.get("path"):
+            return
+        directory = os.path.dirname(entry["path"])
+        if not os.path.isdir(directory):
+            messagebox.showwarning("提示", f"目录不存在: {directory}", parent=self)
+            return
+        try:
+            if os.name == 'nt':
+                os.startfile(directory)
+            else:
+                subprocess.Popen(['xdg-open' if sys.platform != 'darwin' else 'open', directory])
+        except Exception as e:
+            messagebox.showerror("错误", f"无法打开目录: {e}", parent=self)
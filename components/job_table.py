@@ -0,0 +1,180 @@
+# 虚拟化任务列表 - 批量下载进度表
+# 功能: 以表格显示所有任务的状态、进度、速度、剩余时间和大小
+
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+from utils.progress import PHASE_DOWNLOAD, PHASE_LABELS, format_size, format_speed, format_eta
+
+# 列: (标识, 标题, 宽度, 对齐)
+COLUMNS = (
+    ("index", "#", 40, "e"),
+    ("title", "视频", 230, "w"),
+    ("state", "状态", 70, "center"),
+    ("percent", "进度", 60, "e"),
+    ("speed", "速度", 85, "e"),
+    ("eta", "剩余", 60, "e"),
+    ("size", "大小", 80, "e"),
+)
+
+STATE_LABELS = {
+    "queued": "排队中",
+    "extracting": "解析中",
+    "downloading": "下载中",
+    "postprocessing": "后处理中",
+    "done": "完成",
+    "failed": "失败",
+}
+
+
+class JobTable(tk.Frame):
+    """
+    虚拟化的任务进度表
+
+    Treeview 中只保留可见的若干行，滚动时把对应区间的任务数据填入这些行，
+    任务再多也不会创建更多控件。下载线程通过 push_job()/push_progress()
+    写入待更新字典，界面线程按固定帧率调用 flush() 合并应用，只重绘内容
+    发生变化的可见行。写入与取出待更新字典由锁保护：不加锁时写入线程可能
+    在交换字典之后写进已经取走的旧字典，完成/失败状态就此丢失。
+
+    Args:
+        master: 父容器
+        rows: 可见行数
+    """
+
+    def __init__(self, master, rows=6, **kwargs):
+        super().__init__(master, **kwargs)
+        self.visible_rows = rows
+        self._keys = []        # 全部任务，按加入顺序
+        self._positions = {}   # key -> 在 _keys 中的位置
+        self._values = {}      # key -> 显示值
+        self._jobs = {}        # key -> 任务信息 (index, title, state)
+        self._records = {}     # key -> 最近的 ProgressRecord
+        self._pending_jobs = {}
+        self._pending_progress = {}
+        self._pending_lock = threading.Lock()
+        self._top = 0
+        self._rendered = [None] * rows
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in COLUMNS], show="headings",
+                                 height=rows, selectmode="none")
+        for name, heading, width, anchor in COLUMNS:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, anchor=anchor, stretch=(name == "title"))
+        self._slots = [self.tree.insert("", tk.END, values=()) for _ in range(rows)]
+        self.tree.pack(side=tk.LEFT, fill="both", expand=True)
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_to(self._top - 1))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_to(self._top + 1))
+        self._update_scrollbar()
+
+    # ---- 任意线程调用 ----
+
+    def push_job(self, key, index, title, state):
+        """任务加入或状态变化"""
+        with self._pending_lock:
+            self._pending_jobs[key] = (index, title, state)
+
+    def push_progress(self, key, record):
+        """任务进度更新"""
+        with self._pending_lock:
+            self._pending_progress[key] = record
+
+    # ---- 界面线程调用 ----
+
+    def clear(self):
+        self._keys = []
+        self._positions = {}
+        self._values = {}
+        self._jobs = {}
+        self._records = {}
+        with self._pending_lock:
+            self._pending_jobs = {}
+            self._pending_progress = {}
+        self._top = 0
+        self._update_scrollbar()
+        self._render()
+
+    def flush(self):
+        """应用两帧之间累积的更新，只重绘可见行"""
+        with self._pending_lock:
+            jobs, self._pending_jobs = self._pending_jobs, {}
+            progress, self._pending_progress = self._pending_progress, {}
+        if not jobs and not progress:
+            return
+        added = False
+        for key, job in jobs.items():
+            if key not in self._positions:
+                self._positions[key] = len(self._keys)
+                self._keys.append(key)
+                added = True
+            self._jobs[key] = job
+            self._values.pop(key, None)
+        for key, record in progress.items():
+            if key in self._positions:
+                self._records[key] = record
+                self._values.pop(key, None)
+        if added:
+            self._update_scrollbar()
+        self._render()
+
+    def _row_values(self, key):
+        values = self._values.get(key)
+        if values is not None:
+            return values
+        index, title, state = self._jobs[key]
+        record = self._records.get(key)
+        percent = speed = eta = size = ""
+        state_label = STATE_LABELS.get(state, state)
+        if record is not None:
+            size = format_size(record.total_bytes or record.downloaded_bytes or None)
+            if state == "downloading" and record.phase != PHASE_DOWNLOAD:
+                state_label = PHASE_LABELS[record.phase]
+            if state in ("downloading", "postprocessing"):
+                percent = f"{record.percent:.1f}%"
+                if record.phase == PHASE_DOWNLOAD:
+                    speed = format_speed(record.speed)
+                    eta = format_eta(record.eta)
+        if state == "done":
+            percent = "100%"
+        values = (index, title, state_label, percent, speed, eta, size)
+        self._values[key] = values
+        return values
+
+    def _render(self):
+        for slot, item in enumerate(self._slots):
+            position = self._top + slot
+            values = self._row_values(self._keys[position]) if position < len(self._keys) else ()
+            # 内容未变化的行不重绘
+            if self._rendered[slot] != values:
+                self._rendered[slot] = values
+                self.tree.item(item, values=values)
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, len(self._keys) - self.visible_rows))
+        if top != self._top:
+            self._top = top
+            self._render()
+        self._update_scrollbar()
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(round(float(amount) * len(self._keys))))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self._scroll_to(self._top + int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        self._scroll_to(self._top - (1 if event.delta > 0 else -1) * 3)
+        return "break"
+
+    def _update_scrollbar(self):
+        total = len(self._keys)
+        if total <= self.visible_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._top / total, (self._top + self.visible_rows) / total)
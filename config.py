@@ -1,15 +1,252 @@
 import os
+import sys
 import json
+import threading
+import time
 
-CONFIG_FILE = "config.json"
+from utils.persistence import atomic_write, atomic_write_json, set_fsync_policy
+
+# 配置文件与程序放在一起（打包后为 exe 所在目录），不随启动时的工作目录变化
+APP_DIR = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(APP_DIR, "config.json")
+# 检查配置文件是否被外部修改的间隔（秒）
+CONFIG_WATCH_INTERVAL = 2.0
 DEFAULT_DOWNLOAD_DIR = os.path.join(os.path.expanduser("~"), "Downloads", "youtube_downloads")
 
-def load_config():
+
+def app_path(*parts):
+    """程序数据文件的路径：相对路径以 APP_DIR 为基准，与启动时的工作目录无关"""
+    return os.path.join(APP_DIR, os.path.expanduser(os.path.join(*parts)))
+
+
+def legacy_path(name):
+    """
+    旧版本写在工作目录中的数据文件，存在且不是 APP_DIR 中的同一文件时返回其路径
+
+    以前配置、历史记录都以工作目录为基准，从其他目录启动的用户的数据在那里。
+    """
+    path = os.path.abspath(name)
+    if os.path.exists(path) and os.path.normcase(path) != os.path.normcase(app_path(name)):
+        return path
+    return None
+
+# 批量下载调度
+DEFAULT_MAX_WORKERS = 3       # 同时运行的下载任务数
+DEFAULT_PER_HOST_LIMIT = 2    # 同一主机的最大并发任务数
+
+# 视频信息缓存（相对路径以 APP_DIR 为基准，见 app_path；下同）
+DEFAULT_CACHE_DIR = "metadata_cache"
+DEFAULT_CACHE_TTL = 5 * 3600  # 秒；YouTube 直链约6小时后失效
+DEFAULT_CACHE_MAX_MB = 64
+
+# 全局限速（KB/s，0 表示不限速），可选按时间段调整，如
+# "rate_limit_schedule": [{"start": "22:00", "end": "07:00", "limit": 0}]
+DEFAULT_RATE_LIMIT_KB = 0
+
+# MP4 多连接下载：分片并发数和分段请求大小（MB，0 表示不分段）
+DEFAULT_CONCURRENT_FRAGMENTS = 4
+DEFAULT_HTTP_CHUNK_SIZE_MB = 10
+
+# MP3 转码与下载分离，在独立的转码池中并行进行（transcode_workers 为 0 时等于 CPU 核数）
+DEFAULT_PARALLEL_TRANSCODE = True
+
+# 日志窗口保留的最大行数（完整日志写入 logs/downloader.log）
+DEFAULT_LOG_MAX_LINES = 1000
+
+# 批量下载时历史记录中已有的视频：skip 跳过 / verify 文件大小一致才跳过 / force 重新下载
+DEFAULT_ARCHIVE_POLICY = "skip"
+
+# 任务耗时统计输出目录（jobs.jsonl 与 metrics.prom）
+DEFAULT_METRICS_DIR = "metrics"
+
+# 写入配置、历史记录和统计文件时是否 fsync（断电也不丢失已完成的写入，但写入变慢）
+DEFAULT_FSYNC = False
+# 下载历史合并写入：最多等待的毫秒数和缓冲的记录数
+DEFAULT_FLUSH_INTERVAL_MS = 500
+DEFAULT_FLUSH_MAX_RECORDS = 50
+
+# 下载历史数据库只保留近期记录，更早的记录按月压缩归档到 history_archive 目录（0 表示不限）
+DEFAULT_HISTORY_MAX_ROWS = 5000
+DEFAULT_HISTORY_MAX_AGE_DAYS = 365
+
+# 下载完成后按内容哈希去重：off 关闭 / hardlink 与已有的相同文件改为硬链接 / skip 删除新文件
+DEFAULT_DEDUPE = "off"
+
+class ConfigService:
+    """
+    内存中的配置
+
+    启动时读取一次，之后的读取都来自内存；修改时先写临时文件再原子替换，
+    不会留下写了一半的配置文件。订阅者在配置变化（包括外部编辑文件）时收到通知。
+
+    Args:
+        path: 配置文件路径
+    """
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._watcher = None
+        self._stamp = None
+        self._data = self._read() or {}
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _read(self):
+        """读取配置文件，文件不存在时返回空配置，内容无效时返回 None"""
+        self._stamp = self._file_stamp()
+        if self._stamp is None:
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def _write(self):
+        """原子写入（需持有锁）"""
+        atomic_write_json(self.path, self._data, indent=2)
+        self._stamp = self._file_stamp()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._data.get(key, default)
+
+    def snapshot(self):
+        """当前配置的副本"""
+        with self._lock:
+            return json.loads(json.dumps(self._data))
+
+    def update(self, changes):
+        """修改若干配置项并写入文件，返回实际变化的项"""
+        with self._lock:
+            changed = {k: v for k, v in changes.items() if self._data.get(k, _MISSING) != v}
+            if not changed:
+                return {}
+            self._data.update(changed)
+            self._write()
+        self._notify(changed)
+        return changed
+
+    def set(self, key, value):
+        return self.update({key: value})
+
+    def replace(self, data):
+        """整体替换配置（save_config 的语义）"""
+        with self._lock:
+            old = self._data
+            self._data = dict(data)
+            self._write()
+        self._notify(_diff(old, self._data))
+
+    def subscribe(self, callback):
+        """
+        订阅配置变化：callback(changes)，changes 为 {键: 新值}（删除的键为 None）
+
+        回调可能在监视线程中调用。返回取消订阅的函数。
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _notify(self, changes):
+        if not changes:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(changes)
+            except Exception:
+                pass
+
+    def reload(self):
+        """重新读取文件（外部修改后），通知变化的项"""
+        with self._lock:
+            data = self._read()
+            if data is None:
+                return {}  # 外部程序可能正在写入，保留当前配置
+            old, self._data = self._data, data
+            changes = _diff(old, data)
+        self._notify(changes)
+        return changes
+
+    def watch(self, interval=CONFIG_WATCH_INTERVAL):
+        """启动后台线程，按间隔检查文件的修改时间和大小，外部修改时重新读取"""
+        if self._watcher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                stamp = self._file_stamp()
+                if stamp is not None and stamp != self._stamp:
+                    self.reload()
+
+        self._watcher = threading.Thread(target=loop, name="config-watcher", daemon=True)
+        self._watcher.start()
+
+
+_MISSING = object()
+
+
+def _diff(old, new):
+    changes = {k: v for k, v in new.items() if old.get(k, _MISSING) != v}
+    changes.update({k: None for k in old if k not in new})
+    return changes
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_config():
+    """返回进程内共享的配置"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _adopt_legacy_config()
+            _service = ConfigService()
+            set_fsync_policy(_service.get("fsync", DEFAULT_FSYNC))
+            _service.subscribe(_apply_persistence)
+        return _service
+
+
+def _adopt_legacy_config():
+    """APP_DIR 中还没有配置文件时，复制一次工作目录中的旧配置（保留原文件）"""
     if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+        return
+    source = legacy_path("config.json")
+    if source is None:
+        return
+    try:
+        with open(source, 'rb') as f:
+            atomic_write(CONFIG_FILE, f.read())
+    except OSError:
+        pass
+
+
+def _apply_persistence(changes):
+    if "fsync" in changes:
+        set_fsync_policy(changes["fsync"] if changes["fsync"] is not None else DEFAULT_FSYNC)
+
+
+def load_config():
+    """当前配置的副本（来自内存，不读磁盘）"""
+    return get_config().snapshot()
+
 
 def save_config(data):
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+    get_config().replace(data)
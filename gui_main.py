@@ -2,17 +2,36 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
 import os
+from concurrent.futures import Future
 import sys
 import atexit
 import signal
 import subprocess
 import yt_dlp
-from strategies.factory import DownloadStrategyFactory
-from strategies.mp4_strategy import MP4DownloadStrategy
-from strategies.mp3_strategy import MP3DownloadStrategy
-from config import load_config, save_config
-from utils.history import add_download_record
+from strategies.factory import DownloadStrategyFactory, AUDIO_FORMATS
+from config import (load_config, get_config, app_path, DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST_LIMIT,
+                    DEFAULT_CACHE_DIR, DEFAULT_CACHE_TTL, DEFAULT_CACHE_MAX_MB, DEFAULT_RATE_LIMIT_KB,
+                    DEFAULT_LOG_MAX_LINES, DEFAULT_METRICS_DIR,
+                    DEFAULT_FLUSH_INTERVAL_MS, DEFAULT_FLUSH_MAX_RECORDS, DEFAULT_DEDUPE)
+from utils.history import add_download_record, flush_history
+from utils.scheduler import EXTRACTING, POSTPROCESSING, DONE, FAILED
+from utils.cache import MetadataCache
+from utils.ydl_pool import get_pool
+from utils.playlist import is_collection_url
+from utils.journal import JobJournal
+from utils.ratelimit import get_limiter
+from utils.transcode import get_transcode_pool
+from utils.logbuffer import LogBuffer, LOG_FILE
+from utils.metrics import JobMetrics, MetricsRecorder
+from utils.engine import DownloadEngine
+from utils.video_info import get_video_info, download_thumbnail, output_filename
+from utils.output_index import get_output_index
+from utils.dedupe import Deduplicator
+from utils.progress import (ProgressAggregator, UPDATE_INTERVAL_MS, PHASE_DOWNLOAD, PHASE_POSTPROCESS, PHASE_LABELS,
+                            format_size, format_speed, format_eta)
 from components.silent_exit_gui_base import SilentExitGUIBase
+from components.job_table import JobTable
+from components.history_panel import HistoryPanel
 
 class YouTubeDownloaderGUI(SilentExitGUIBase):
     def __init__(self, root):
@@ -24,7 +43,7 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
         )
         
         # 设置窗口基本属性
-        self.root.geometry("650x650")
+        self.root.geometry("650x820")
         self.root.configure(bg="#f8f9fa")
         self.root.resizable(True, True)  # 允许窗口大小调整
         
@@ -38,8 +57,44 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
         """设置用户界面"""
         # 加载配置
         config = load_config()
+        
+        # 日志缓冲：界面只保留最近的行，完整日志写入滚动文件
+        self.log_buffer = LogBuffer(
+            max_lines=config.get("log_max_lines", DEFAULT_LOG_MAX_LINES),
+            log_file=app_path(config.get("log_file", LOG_FILE))
+        )
         self.download_dir = config.get("download_dir", os.path.join(os.path.expanduser("~"), "Downloads", "youtube_downloads"))
         
+        # 全局限速（所有下载共享）
+        self.rate_limit_kb = config.get("rate_limit", DEFAULT_RATE_LIMIT_KB)
+        limiter = get_limiter()
+        limiter.set_limit(self.rate_limit_kb * 1024)
+        limiter.set_schedule([
+            dict(rule, limit=rule.get("limit", 0) * 1024)
+            for rule in config.get("rate_limit_schedule", [])
+            if isinstance(rule, dict)
+        ])
+        
+        # 进度事件合并器
+        self.progress_aggregator = ProgressAggregator()
+        
+        # 任务耗时统计（JSON Lines + Prometheus 快照）
+        self.metrics_recorder = MetricsRecorder(
+            app_path(config.get("metrics_dir", DEFAULT_METRICS_DIR)),
+            flush_interval_ms=config.get("flush_interval_ms", DEFAULT_FLUSH_INTERVAL_MS),
+            flush_max_records=config.get("flush_max_records", DEFAULT_FLUSH_MAX_RECORDS))
+        
+        # 批量任务日志（中断后恢复）
+        self.journal = JobJournal()
+        self.active_engine = None
+        
+        # 视频信息缓存
+        self.metadata_cache = MetadataCache(
+            app_path(config.get("metadata_cache_dir", DEFAULT_CACHE_DIR)),
+            ttl=config.get("metadata_cache_ttl", DEFAULT_CACHE_TTL),
+            max_bytes=config.get("metadata_cache_max_mb", DEFAULT_CACHE_MAX_MB) * 1024 * 1024
+        )
+        
         # 确保下载目录存在
         if not os.path.exists(self.download_dir):
             try:
@@ -104,7 +159,7 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
         
         self.format_var = tk.StringVar(value="mp4")
         format_dropdown = ttk.Combobox(main_options_frame, textvariable=self.format_var, 
-                                     values=["mp4", "mp3"], state="readonly",
+                                     values=["mp4", "mp3", "m4a", "opus"], state="readonly",
                                      font=("Arial", 9), width=6)
         format_dropdown.pack(side=tk.LEFT, padx=(0, 15))
         
@@ -116,6 +171,22 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
                                         font=("Arial", 9, "bold"), fg="#495057", bg="#f8f9fa")
         thumbnail_check.pack(side=tk.LEFT, padx=(0, 15))
         
+        # 限速设置（KB/s，0为不限速，回车或离开输入框后立即生效）
+        rate_label = tk.Label(main_options_frame, text="⏱ 限速:", 
+                             font=("Arial", 9, "bold"), fg="#495057", bg="#f8f9fa")
+        rate_label.pack(side=tk.LEFT, padx=(0, 3))
+        
+        self.rate_limit_var = tk.StringVar(value=str(self.rate_limit_kb))
+        rate_entry = tk.Entry(main_options_frame, textvariable=self.rate_limit_var,
+                             width=6, font=("Arial", 9), relief="solid", bd=1)
+        rate_entry.pack(side=tk.LEFT)
+        rate_entry.bind("<Return>", lambda e: self.apply_rate_limit())
+        rate_entry.bind("<FocusOut>", lambda e: self.apply_rate_limit())
+        
+        rate_unit_label = tk.Label(main_options_frame, text="KB/s", 
+                                  font=("Arial", 9), fg="#6c757d", bg="#f8f9fa")
+        rate_unit_label.pack(side=tk.LEFT, padx=(2, 15))
+        
         # 功能亮点按钮（右侧）
         features_button = tk.Button(main_options_frame, text="🌟 亮点", 
                                    command=self.show_features, 
@@ -125,6 +196,15 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
                                    cursor="hand2")
         features_button.pack(side=tk.LEFT, padx=(0, 8))
         
+        # 下载历史按钮（右侧）
+        history_button = tk.Button(main_options_frame, text="🕘 历史", 
+                                  command=self.show_history, 
+                                  font=("Arial", 9), 
+                                  bg="#6c757d", fg="white",
+                                  relief="flat", padx=8, pady=3,
+                                  cursor="hand2")
+        history_button.pack(side=tk.LEFT, padx=(0, 8))
+        
         # 使用说明按钮（右侧）
         self.usage_toggle_button = tk.Button(main_options_frame, text="📖 说明", 
                                            command=self.toggle_usage, 
@@ -208,6 +288,10 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
         self.progress['value'] = 0      # 初始值为0
         self.progress.pack(pady=(0, 8), fill="x")
         
+        # 任务列表（只渲染可见行，批量下载时显示每个任务的进度）
+        self.job_table = JobTable(progress_frame, rows=6, bg="#f8f9fa")
+        self.job_table.pack(pady=(0, 8), fill="x")
+        
         # 中层：状态标签（速度、剩余时间、百分比）
         self.status_label = tk.Label(progress_frame, text="[状态] 等待下载...", 
                                     wraplength=600, font=("Arial", 9), 
@@ -254,6 +338,18 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
         
         # 初始化日志内容
         self.log("[系统] YouTube下载器启动完成，等待操作...")
+        
+        # 启动进度和日志刷新（固定帧率合并下载线程的事件）
+        self._progress_logged = {}
+        self.root.after(UPDATE_INTERVAL_MS, self._progress_tick)
+        self.root.after(UPDATE_INTERVAL_MS, self._flush_log)
+        
+        # 配置变化时立即生效（同时监视外部对 config.json 的修改）
+        get_config().subscribe(self._on_config_change)
+        get_config().watch()
+        
+        # 检查上次是否有未完成的批量任务
+        self.root.after(300, self.check_resume)
     
     # ===========================================
     # 重写基类方法（自定义清理逻辑）
@@ -269,7 +365,21 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
             # 清理临时文件（如果有）
             # self.clean_temp_files()
             
-            pass  # 目前没有特殊的清理需求
+            # 停止派发新的批量任务，任务日志保留进行中的状态以便下次恢复
+            if self.active_engine:
+                self.active_engine.cancel()
+            self.journal.close()
+            self.log_buffer.close()
+            
+            # 写入合并缓冲区中的历史记录和任务统计
+            flush_history()
+            self.metrics_recorder.close()
+            
+            # 关闭复用的 YoutubeDL 实例（保存 Cookie、释放连接）
+            get_pool().close()
+            
+            # 终止后台转码的 ffmpeg 进程
+            get_transcode_pool().shutdown()
             
         except Exception:
             pass  # 静默失败，不影响程序关闭
@@ -277,6 +387,21 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
         # 调用基类清理（包括进程管理和静默退出优化）
         super().cleanup_processes()
     
+    def check_resume(self):
+        """启动时检查任务日志，询问是否恢复上次中断的批量下载"""
+        pending = self.journal.pending_batch()
+        if not pending:
+            return
+        urls, download_type, download_thumb = pending
+        if messagebox.askyesno("恢复下载", f"检测到上次未完成的批量下载（{len(urls)} 个链接），是否继续？\n已完成的视频将被跳过，未完成的从中断处继续。"):
+            self.batch_text.delete("1.0", tk.END)
+            self.batch_text.insert("1.0", "\n".join(urls))
+            self.format_var.set(download_type)
+            self.download_video_thumbnail_var.set(download_thumb)
+            self.start_download()
+        else:
+            self.journal.finish_batch()
+
     def toggle_usage(self):
         """切换使用说明的显示/隐藏状态"""
         if self.usage_visible:
@@ -304,6 +429,8 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
             r'^https?://(www\.)?youtube\.com/watch\?v=[a-zA-Z0-9_-]+',
             r'^https?://(www\.)?youtube\.com/shorts/[a-zA-Z0-9_-]+',
             r'^https?://(www\.)?youtube\.com/playlist\?list=[a-zA-Z0-9_-]+',
+            r'^https?://(www\.)?youtube\.com/@[\w.-]+',
+            r'^https?://(www\.)?youtube\.com/(channel|c|user)/[\w.-]+',
             r'^https?://youtu\.be/[a-zA-Z0-9_-]+',
             r'^https?://m\.youtube\.com/watch\?v=[a-zA-Z0-9_-]+'
         ]
@@ -319,13 +446,22 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
         
         return True, ""
     
+    def show_history(self):
+        """打开下载历史浏览窗口（已打开时切换到前台）"""
+        panel = getattr(self, 'history_panel', None)
+        if panel is not None and panel.winfo_exists():
+            panel.lift()
+            panel.refresh()
+            return
+        self.history_panel = HistoryPanel(self.root)
+    
     def show_features(self):
         """显示软件功能亮点（重新总结的内容）"""
         features_text = """🎆 YouTube下载器 - 功能亮点 🎆
 
 🎥 核心下载功能：
 • 支持 MP4 高清视频下载（最高 4K 超清）
-• 支持 MP3 音频提取（192kbps 高品质音质） 
+• 支持 MP3/M4A/Opus 音频提取（编码一致时直接复制，不损失音质） 
 • 批量下载多个视频（无数量限制）
 • 智能文件命名（标题+上传者+分辨率）
 
@@ -351,7 +487,7 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
 • 跨平台支持（Windows/Mac/Linux）
 • 支持所有 YouTube 视频格式
 • 支持 YouTube Shorts 短视频
-• 支持播放列表整体下载
+• 支持播放列表/频道逐个视频下载（边展开边下载）
 
 ✨ 最新优化：
 • 网络连接稳定性大幅提升
@@ -362,90 +498,32 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
         messagebox.showinfo("🎆 软件功能亮点", features_text)
 
     def log(self, message, color=None):
-        self.log_text.insert(tk.END, f"{message}\n", color)
-        self.log_text.see(tk.END)
-        self.root.update()
+        """记录日志（任意线程可调用，界面按固定帧率批量刷新）"""
+        self.log_buffer.append(message, color)
     
-    def get_video_info(self, url):
-        """获取视频信息"""
-        import yt_dlp
-        import re
-        from datetime import datetime
-        
+    def _flush_log(self):
+        """把待显示的日志一次性插入控件，并只保留最近 max_lines 行"""
         try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'retries': 3,
-                'fragment_retries': 3,
-                'socket_timeout': 30,
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                title = info.get('title', '')
-                uploader = info.get('uploader', '')
-                height = info.get('height', 0)
-                ext = info.get('ext', 'mp4')
-                
-                # 对于视频文件，默认使用mp4格式
-                if ext in ['webm', 'mkv', 'flv']:
-                    ext = 'mp4'
+            lines = self.log_buffer.drain()
+            if lines:
+                args = []
+                for message, tag in lines:
+                    args.extend((f"{message}\n", tag or ()))
+                self.log_text.insert(tk.END, *args)
                 
-                # 清理文件名中的非法字符
-                def clean_filename(name):
-                    if not name:
-                        return ''
-                    # 移除或替换非法字符
-                    name = re.sub(r'[<>:"/\|?*]', '_', name)
-                    # 限制长度
-                    return name[:50] if len(name) > 50 else name
-                
-                clean_title = clean_filename(title)
-                clean_uploader = clean_filename(uploader)
-                
-                # 生成文件名
-                if clean_title:
-                    if clean_uploader:
-                        if height > 0:
-                            filename = f"{clean_title}_{clean_uploader}_{height}p.{ext}"
-                        else:
-                            filename = f"{clean_title}_{clean_uploader}.{ext}"
-                    else:
-                        if height > 0:
-                            filename = f"{clean_title}_{height}p.{ext}"
-                        else:
-                            filename = f"{clean_title}.{ext}"
-                else:
-                    # 没有标题时使用时间格式
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"video_{timestamp}.{ext}"
-                
-                return {
-                    'title': title,
-                    'uploader': uploader,
-                    'height': height,
-                    'ext': ext,
-                    'filename': filename,
-                    'thumbnail': info.get('thumbnail')  # 添加封面链接
-                }
-                
-        except Exception as e:
-            self.log(f"[错误] 获取视频信息失败: {e}")
-            # 如果获取信息失败，使用默认文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            return {
-                'title': '',
-                'uploader': '',
-                'height': 0,
-                'ext': 'mp4',
-                'filename': f"video_{timestamp}.mp4",
-                'thumbnail': None
-            }
+                line_count = int(self.log_text.index("end-1c").split(".")[0])
+                excess = line_count - self.log_buffer.max_lines
+                if excess > 0:
+                    self.log_text.delete("1.0", f"{excess + 1}.0")
+                self.log_text.see(tk.END)
+        except Exception:
+            pass
+        finally:
+            self.root.after(UPDATE_INTERVAL_MS, self._flush_log)
+    
+    def get_video_info(self, url):
+        """获取视频信息"""
+        return get_video_info(url, self.metadata_cache, self.log)
 
     def choose_directory(self):
         directory = filedialog.askdirectory()
@@ -463,66 +541,56 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
                     return
             
             # 保存配置
-            config = load_config()
-            config["download_dir"] = directory
-            save_config(config)
+            get_config().set("download_dir", directory)
             self.log(f"[设置] 下载目录变更为: {directory}")
     
-    def download_video_thumbnail(self, video_info, output_dir):
-        """下载视频封面"""
+    def apply_rate_limit(self):
+        """应用限速设置并保存到配置"""
         try:
-            import urllib.request
-            import urllib.error
-            import ssl
-            
-            thumbnail_url = video_info.get('thumbnail')
-            if not thumbnail_url:
-                self.log("[警告] 未找到封面链接")
-                return None
-            
-            # 确保输出目录存在
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir, exist_ok=True)
-                self.log(f"[信息] 创建下载目录: {output_dir}")
-            
-            # 生成封面文件名
-            base_filename = video_info['filename'].rsplit('.', 1)[0]  # 移除扩展名
-            thumbnail_filename = f"{base_filename}.png"
-            thumbnail_path = os.path.join(output_dir, thumbnail_filename)
-            
-            self.log(f"[封面] 开始下载封面: {thumbnail_filename}")
-            
-            # 创建不验证SSL证书的上下文
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-            
-            # 下载封面，添加重试机制
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    request = urllib.request.Request(
-                        thumbnail_url,
-                        headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-                    )
-                    
-                    with urllib.request.urlopen(request, context=ssl_context, timeout=30) as response:
-                        with open(thumbnail_path, 'wb') as f:
-                            f.write(response.read())
-                    
-                    self.log(f"[成功] 封面下载完成: {thumbnail_filename}")
-                    return thumbnail_path
-                    
-                except (urllib.error.URLError, ssl.SSLError, TimeoutError) as e:
-                    if attempt < max_retries - 1:
-                        self.log(f"[重试] 封面下载失败，第{attempt + 1}次重试: {e}")
-                        continue
-                    else:
-                        raise e
-            
-        except Exception as e:
-            self.log(f"[错误] 封面下载失败: {e}")
-            return None
+            value = max(0, int(float(self.rate_limit_var.get().strip() or 0)))
+        except ValueError:
+            self.rate_limit_var.set(str(self.rate_limit_kb))
+            return
+        self.rate_limit_var.set(str(value))
+        if value == self.rate_limit_kb:
+            return
+        self.rate_limit_kb = value
+        get_limiter().set_limit(value * 1024)
+        
+        get_config().set("rate_limit", value)
+        self.log(f"[设置] 限速变更为: {value} KB/s" if value else "[设置] 已取消限速")
+    
+    def _on_config_change(self, changes):
+        """配置变化（包括外部编辑 config.json）时在界面线程中应用"""
+        self.root.after(0, lambda: self._apply_config_changes(changes))
+    
+    def _apply_config_changes(self, changes):
+        limiter = get_limiter()
+        if "rate_limit" in changes:
+            value = max(0, int(changes["rate_limit"] or 0))
+            if value != self.rate_limit_kb:
+                self.rate_limit_kb = value
+                self.rate_limit_var.set(str(value))
+                limiter.set_limit(value * 1024)
+                self.log(f"[设置] 配置文件更新，限速: {value} KB/s" if value else "[设置] 配置文件更新，已取消限速")
+        if "rate_limit_schedule" in changes:
+            limiter.set_schedule([
+                dict(rule, limit=rule.get("limit", 0) * 1024)
+                for rule in changes["rate_limit_schedule"] or []
+                if isinstance(rule, dict)
+            ])
+        directory = changes.get("download_dir")
+        if directory and directory != self.download_dir:
+            self.download_dir = directory
+            self.dir_label.config(text=directory)
+            self.log(f"[设置] 配置文件更新，下载目录: {directory}")
+    
+    def download_video_thumbnail(self, video_info, output_dir, metrics=None):
+        """下载视频封面（提供 metrics 时记录耗时和重试次数）"""
+        path = download_thumbnail(video_info, output_dir, self.log, metrics)
+        if path:
+            get_output_index(output_dir).add(path)
+        return path
 
     def start_download(self):
         url = self.url_entry.get().strip()
@@ -563,75 +631,75 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
 
         self.download_button.config(state=tk.DISABLED, text="下载中...", bg="#6c757d")
         self.progress['value'] = 0
+        self.job_table.clear()
         self.log(f"准备下载: {url if not use_batch else '批量模式'} 格式: {download_type}")
 
         thread = threading.Thread(target=self.download_worker, args=(url, download_type, use_batch, download_thumb))
         thread.daemon = True  # 设置为守护线程
         thread.start()
 
+    def _progress_tick(self):
+        """按固定帧率刷新进度：每帧只处理各任务的最新状态"""
+        try:
+            updates = self.progress_aggregator.drain()
+            for key, record in updates.items():
+                self.job_table.push_progress(key, record)
+                p = record.percent
+                
+                # 记录日志（减少频繁日志输出）：单个下载每5%，批量每10%
+                step = 5 if key is None else 10
+                bucket = int(p) // step
+                if record.phase == PHASE_DOWNLOAD and bucket > self._progress_logged.get(key, -1):
+                    self._progress_logged[key] = bucket
+                    if key is None:
+                        self.log(f"[进度] {p:.1f}% - 速度: {format_speed(record.speed)}")
+                    else:
+                        total = len(self.active_engine.jobs) if self.active_engine else key.index
+                        self.log(f"[批量 {key.index}/{total}] 进度: {p:.1f}% - 速度: {format_speed(record.speed)}")
+            
+            if updates:
+                # 进度条和状态显示最近更新的任务
+                key, record = list(updates.items())[-1]
+                p = record.percent
+                self.progress['value'] = p
+                if record.phase != PHASE_DOWNLOAD:
+                    detail = f"{PHASE_LABELS[record.phase]} | 大小: {format_size(record.total_bytes or record.downloaded_bytes)}"
+                elif key is None:
+                    detail = f"速度: {format_speed(record.speed)} | 剩余: {format_eta(record.eta)} | 进度: {p:.1f}%"
+                else:
+                    detail = f"速度: {format_speed(record.speed)} | 进度: {p:.1f}% | 剩余: {format_eta(record.eta)}"
+                self.status_label.config(text=detail if key is None else f"第{key.index}条视频： {detail}")
+            self.job_table.flush()
+        except Exception as ex:
+            self.log(f"[进度错误] {ex}")
+        finally:
+            self.root.after(UPDATE_INTERVAL_MS, self._progress_tick)
+
     def download_worker(self, url, download_type, use_batch, download_thumb=False):
+        output_file = None
         try:
-            factory = DownloadStrategyFactory()
+            self._progress_logged.pop(None, None)
+            metrics = JobMetrics(url, download_type)
+            def progress_callback(record):
+                metrics.observe(record)
+                self.progress_aggregator.update(None, record)
 
-            def progress_callback(percent, speed, eta):
-                try:
-                    # 清理ANSI颜色代码的函数
-                    import re
-                    def clean_ansi(text):
-                        if isinstance(text, str):
-                            # 移除ANSI颜色代码
-                            return re.sub(r'\x1b\[[0-9;]*m', '', text).strip()
-                        return text
-                    
-                    # 清理所有字段的ANSI代码
-                    clean_percent = clean_ansi(percent)
-                    clean_speed = clean_ansi(speed)
-                    clean_eta = clean_ansi(eta)
-                    
-                    # 解析百分比
-                    if isinstance(clean_percent, str):
-                        if '%' in clean_percent:
-                            p = float(clean_percent.replace('%', ''))
-                        else:
-                            p = float(clean_percent) if clean_percent != 'N/A' else 0
-                    else:
-                        p = float(clean_percent) if clean_percent != 'N/A' else 0
-                    
-                    # 使用更直接的方式更新进度条
-                    def update_progress():
-                        self.progress['value'] = p
-                        self.root.update_idletasks()  # 强制刷新UI
-                    
-                    # 使用更直接的方式更新状态
-                    def update_status():
-                        status = f"速度: {clean_speed} | 剩余: {clean_eta} | 进度: {p:.1f}%"
-                        self.status_label.config(text=status)
-                        self.root.update_idletasks()  # 强制刷新UI
-                    
-                    # 在主线程中执行更新
-                    self.root.after(0, update_progress)
-                    self.root.after(0, update_status)
-                    
-                    # 记录日志（减少频繁日志输出）
-                    if int(p) % 5 == 0 or p >= 100:  # 每5%记录一次，或100%时记录
-                        self.root.after(0, lambda: self.log(f"[进度] {p:.1f}% - 速度: {clean_speed}"))
-                except Exception as ex:
-                    # 记录更详细的错误信息以便调试
-                    self.root.after(0, lambda: self.log(f"[进度错误] 原始数据: percent='{percent}', speed='{speed}', eta='{eta}', 错误: {ex}"))
-
-            if download_type == "mp4":
-                strategy = MP4DownloadStrategy(progress_callback) if not use_batch else factory.get_strategy(download_type)
-            elif download_type == "mp3":
-                strategy = MP3DownloadStrategy(progress_callback) if not use_batch else factory.get_strategy(download_type)
-            else:
-                raise ValueError("不支持的格式")
+            config = load_config()
+            factory = DownloadStrategyFactory()
+            options = factory.options_from_config(download_type, config)
+            strategy = factory.get_strategy(download_type, progress_callback, **options)
 
             if use_batch:
-                self.handle_batch_download(strategy, download_type, download_thumb)
+                self.handle_batch_download(download_type, download_thumb)
+            elif is_collection_url(url):
+                # 播放列表/频道按批量模式逐个视频下载
+                self.handle_batch_download(download_type, download_thumb, [url])
             else:
                 # 获取视频信息生成文件名
                 self.log("[信息] 正在获取视频信息...")
-                video_info = self.get_video_info(url)
+                self.job_table.push_job(None, 1, url, "extracting")
+                with metrics.span("extract"):
+                    video_info = self.get_video_info(url)
                 
                 # 更新视频信息显示（新布局）
                 title = video_info.get('title', 'Unknown')
@@ -646,146 +714,142 @@ class YouTubeDownloaderGUI(SilentExitGUIBase):
                 channel_info = f"@{uploader}"
                 self.root.after(0, lambda: self.channel_info_label.config(text=channel_info))
                 
-                # 根据下载格式调整文件名
-                if download_type == "mp3":
-                    filename = video_info['filename'].rsplit('.', 1)[0] + '.mp3'
-                else:
-                    filename = video_info['filename']
-                
-                output_file = os.path.join(self.download_dir, filename)
-                self.log(f"[信息] 文件名: {filename}")
+                # 根据下载格式调整文件名，与目录中已有的文件或进行中的任务重复时添加序号
+                output_index = get_output_index(self.download_dir)
+                output_file = output_index.reserve(output_filename(video_info, download_type))
+                self.log(f"[信息] 文件名: {os.path.basename(output_file)}")
                 
                 # 下载封面（如果选中）
                 if download_thumb:
-                    self.download_video_thumbnail(video_info, self.download_dir)
+                    self.download_video_thumbnail(video_info, self.download_dir, metrics)
                 
-                strategy.download(url, output_file)
+                self.job_table.push_job(None, 1, video_info['title'] or url, "downloading")
+                metrics.begin(PHASE_DOWNLOAD)
+                result = strategy.download(url, output_file, video_info.get('info_dict'))
+                if isinstance(result, Future):
+                    self.log("[信息] 下载完成，正在转码...")
+                    metrics.begin(PHASE_POSTPROCESS)
+                    self.job_table.push_job(None, 1, video_info['title'] or url, "postprocessing")
+                    result.result()
+                deduplicator = Deduplicator(mode=config.get("dedupe", DEFAULT_DEDUPE), log=self.log)
+                output_file, dedupe_fields = deduplicator.process(output_file, metrics)
+                self.metrics_recorder.record(metrics, DONE)
+                self.job_table.push_job(None, 1, video_info['title'] or url, "done")
+                if strategy.record_fields.get('audio_path'):
+                    self.log(f"[信息] 音频处理方式: {strategy.record_fields['audio_path']}")
                 self.root.after(0, lambda: self.log("[成功] 下载完成！"))
                 self.root.after(0, lambda: messagebox.showinfo("完成", "下载完成！"))
                 
                 # 使用获取到的标题信息
                 title = video_info['title'] or 'Unknown'
-                add_download_record(title, download_type, output_file, url)
+                add_download_record(title, download_type, output_file, url,
+                                    uploader=video_info.get('uploader'), **strategy.record_fields, **dedupe_fields)
         except Exception as e:
             error_msg = str(e)
+            if not use_batch and not is_collection_url(url):
+                self.metrics_recorder.record(metrics, FAILED)
+                self.job_table.push_job(None, 1, url, "failed")
+                if output_file:
+                    output_index.release(output_file)
             self.root.after(0, lambda: self.log(f"[错误] 下载失败: {error_msg}"))
             self.root.after(0, lambda: messagebox.showerror("错误", f"下载失败: {error_msg}"))
         finally:
             self.root.after(0, lambda: self.download_button.config(state=tk.NORMAL, text="🚀 开始下载", bg="#dc3545"))
 
-    def handle_batch_download(self, strategy, download_type, download_thumb=False):
-        urls = self.batch_text.get("1.0", tk.END).strip().split('\n')
-        urls = [u.strip() for u in urls if u.strip()]
-        total = len(urls)
-        completed_count = 0  # 记录完成的任务数
+    def handle_batch_download(self, download_type, download_thumb=False, urls=None):
+        if urls is None:
+            urls = self.batch_text.get("1.0", tk.END).strip().split('\n')
+            urls = [u.strip() for u in urls if u.strip()]
+
+        config = load_config()
+        max_workers = config.get("max_workers", DEFAULT_MAX_WORKERS)
+        per_host_limit = config.get("per_host_limit", DEFAULT_PER_HOST_LIMIT)
+        self.root.after(0, lambda: self.log(f"[批量] 共 {len(urls)} 个链接，并发数: {max_workers}，单主机上限: {per_host_limit}"))
+
+        def job_count():
+            # 播放列表边展开边下载，任务总数随之增长
+            return len(engine.jobs)
+
+        def on_prepared(job):
+            # 更新视频信息显示（批量下载新布局）
+            video_info = job.video_info
+            title = video_info.get('title', 'Unknown')
+            uploader = video_info.get('uploader', 'Unknown')
+            height = video_info.get('height', 0)
+
+            # 下层：[批量 序号] 分辨率_视频标题
+            resolution_title = f"[批量 {job.index}/{job_count()}] {height}p_{title}" if height > 0 else f"[批量 {job.index}/{job_count()}] {title}"
+            self.root.after(0, lambda: self.video_title_label.config(text=resolution_title))
+
+            # 底层：@频道信息
+            channel_info = f"@{uploader}"
+            self.root.after(0, lambda: self.channel_info_label.config(text=channel_info))
+
+        # 为批量下载创建专用的进度回调（界面按固定帧率统一刷新）
+        def batch_progress_callback(job, record):
+            self.progress_aggregator.update(job, record)
+
+        def on_update(job):
+            self.job_table.push_job(job, job.index, job.title or job.url, job.state)
+            i, u, t = job.index, job.url, job_count()
+            if job.state in (DONE, FAILED):
+                self._progress_logged.pop(job, None)
+            if job.skipped:
+                self.root.after(0, lambda: self.log(f"[批量 {i}/{t}] 已下载，跳过: {u}"))
+            elif job.state == EXTRACTING:
+                self.root.after(0, lambda: self.log(f"[批量 {i}/{t}] 开始: {u}"))
+            elif job.state == POSTPROCESSING and download_type in AUDIO_FORMATS:
+                self.root.after(0, lambda: self.log(f"[批量 {i}/{t}] 下载完成，转码中: {u}"))
+            elif job.state == DONE:
+                self.root.after(0, lambda: self.log(f"[批量 {i}/{t}] 完成: {u}"))
+            elif job.state == FAILED:
+                err = job.error
+                self.root.after(0, lambda: self.log(f"[批量 {i}/{t}] 失败: {err}"))
+
+        if self.journal.start_batch(urls, download_type, download_thumb):
+            self.root.after(0, lambda: self.log("[批量] 恢复上次中断的批量下载"))
+
+        # 文件名、封面、去重和历史记录由下载引擎处理（与命令行、HTTP 服务相同），
+        # 界面只负责显示
+        engine = DownloadEngine(self.download_dir, config,
+                                progress_callback=batch_progress_callback,
+                                on_update=on_update,
+                                on_prepared=on_prepared,
+                                log=self.log,
+                                max_workers=max_workers,
+                                per_host_limit=per_host_limit,
+                                metrics=self.metrics_recorder,
+                                journal=self.journal,
+                                metadata_cache=self.metadata_cache)
+        self.active_engine = engine
+        engine.start()
+        try:
+            for url in urls:
+                if not engine.submit(url, download_type, thumbnail=download_thumb) and not is_collection_url(url):
+                    self.root.after(0, lambda u=url: self.log(f"[批量] 跳过重复链接: {u}"))
+            self.journal.mark_expanded()
+        except RuntimeError:
+            pass  # 程序关闭时引擎已取消
+        finally:
+            engine.close()
+        engine.wait()
+        self.active_engine = None
+
+        total_jobs = len(engine.jobs)
+        completed_count = engine.counts()[DONE]  # 记录完成的任务数
+        if completed_count == total_jobs:
+            # 全部完成后清除任务日志；有失败时保留，下次启动可重试
+            self.journal.finish_batch()
 
-        for idx, url in enumerate(urls):
-            current_num = idx + 1
-            self.root.after(0, lambda i=current_num, t=total, u=url: self.log(f"[批量 {i}/{t}] 开始: {u}"))
-            
-            try:
-                # 获取视频信息生成文件名
-                video_info = self.get_video_info(url)
-                
-                # 更新视频信息显示（批量下载新布局）
-                title = video_info.get('title', 'Unknown')
-                uploader = video_info.get('uploader', 'Unknown')
-                height = video_info.get('height', 0)
-                
-                # 下层：[批量 序号] 分辨率_视频标题
-                resolution_title = f"[批量 {current_num}/{total}] {height}p_{title}" if height > 0 else f"[批量 {current_num}/{total}] {title}"
-                self.root.after(0, lambda: self.video_title_label.config(text=resolution_title))
-                
-                # 底层：@频道信息
-                channel_info = f"@{uploader}"
-                self.root.after(0, lambda: self.channel_info_label.config(text=channel_info))
-                
-                # 根据下载格式调整文件名
-                if download_type == "mp3":
-                    filename = video_info['filename'].rsplit('.', 1)[0] + '.mp3'
-                else:
-                    filename = video_info['filename']
-                
-                # 如果文件名重复，添加序号
-                base_name, ext = os.path.splitext(filename)
-                counter = 1
-                original_filename = filename
-                while os.path.exists(os.path.join(self.download_dir, filename)):
-                    filename = f"{base_name}_{counter}{ext}"
-                    counter += 1
-                
-                output_file = os.path.join(self.download_dir, filename)
-                
-                # 下载封面（如果选中）
-                if download_thumb:
-                    self.download_video_thumbnail(video_info, self.download_dir)
-                
-                # 为批量下载创建专用的进度回调
-                def batch_progress_callback(percent, speed, eta):
-                    try:
-                        import re
-                        def clean_ansi(text):
-                            if isinstance(text, str):
-                                return re.sub(r'\x1b\[[0-9;]*m', '', text).strip()
-                            return text
-                        
-                        clean_percent = clean_ansi(percent)
-                        clean_speed = clean_ansi(speed)
-                        clean_eta = clean_ansi(eta)
-                        
-                        if isinstance(clean_percent, str):
-                            if '%' in clean_percent:
-                                p = float(clean_percent.replace('%', ''))
-                            else:
-                                p = float(clean_percent) if clean_percent != 'N/A' else 0
-                        else:
-                            p = float(clean_percent) if clean_percent != 'N/A' else 0
-                        
-                        # 更新进度条和状态
-                        def update_progress():
-                            self.progress['value'] = p
-                            status = f"第{current_num}条视频： 速度: {clean_speed} | 进度: {p:.1f}% | 剩余: {clean_eta}"
-                            self.status_label.config(text=status)
-                            self.root.update_idletasks()
-                        
-                        self.root.after(0, update_progress)
-                        
-                        # 记录批量进度日志
-                        if int(p) % 10 == 0 or p >= 100:  # 每10%记录一次
-                            self.root.after(0, lambda: self.log(f"[批量 {current_num}/{total}] 进度: {p:.1f}% - 速度: {clean_speed}"))
-                    except Exception as ex:
-                        pass
-                
-                # 为批量下载创建特殊的策略实例
-                from strategies.factory import DownloadStrategyFactory
-                factory = DownloadStrategyFactory()
-                if download_type == "mp4":
-                    batch_strategy = factory.get_strategy(download_type, batch_progress_callback)
-                else:
-                    batch_strategy = factory.get_strategy(download_type, batch_progress_callback)
-                
-                batch_strategy.download(url, output_file)
-                self.root.after(0, lambda i=current_num, t=total, u=url: self.log(f"[批量 {i}/{t}] 完成: {u}"))
-                
-                # 使用获取到的标题信息
-                title = video_info['title'] or 'Unknown'
-                add_download_record(title, download_type, output_file, url)
-                
-                completed_count += 1  # 成功完成一个任务
-                
-            except Exception as e:
-                error_msg = str(e)
-                self.root.after(0, lambda i=current_num, t=total, err=error_msg: self.log(f"[批量 {i}/{t}] 失败: {err}"))
-        
         # 所有批量任务完成后的提示
-        if completed_count == total:
-            self.root.after(0, lambda: self.log(f"[批量完成] 所有下载任务已完成！成功: {completed_count}/{total}", "success"))
+        if completed_count == total_jobs:
+            self.root.after(0, lambda: self.log(f"[批量完成] 所有下载任务已完成！成功: {completed_count}/{total_jobs}", "success"))
         else:
-            self.root.after(0, lambda: self.log(f"[批量完成] 下载任务结束！成功: {completed_count}/{total}，失败: {total - completed_count}", "error"))
-        if completed_count == total:
-            self.root.after(0, lambda: messagebox.showinfo("批量下载完成", f"所有 {total} 个下载任务已完成！"))
+            self.root.after(0, lambda: self.log(f"[批量完成] 下载任务结束！成功: {completed_count}/{total_jobs}，失败: {total_jobs - completed_count}", "error"))
+        if completed_count == total_jobs:
+            self.root.after(0, lambda: messagebox.showinfo("批量下载完成", f"所有 {total_jobs} 个下载任务已完成！"))
         else:
-            self.root.after(0, lambda: messagebox.showwarning("批量下载完成", f"批量下载结束！成功: {completed_count}/{total}，失败: {total - completed_count}"))
+            self.root.after(0, lambda: messagebox.showwarning("批量下载完成", f"批量下载结束！成功: {completed_count}/{total_jobs}，失败: {total_jobs - completed_count}"))
 
 def main():
     """主程序入口（静默模式）"""
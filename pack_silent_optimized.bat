@@ -88,7 +88,26 @@ REM 使用成功测试的简化配置（修复图标问题）
     --hidden-import=strategies.mp3_strategy ^
     --hidden-import=strategies.base_strategy ^
     --hidden-import=utils.history ^
+    --hidden-import=utils.scheduler ^
+    --hidden-import=utils.engine ^
+    --hidden-import=utils.cache ^
+    --hidden-import=utils.urls ^
+    --hidden-import=utils.ydl_pool ^
+    --hidden-import=utils.playlist ^
+    --hidden-import=utils.journal ^
+    --hidden-import=utils.ratelimit ^
+    --hidden-import=utils.transcode ^
+    --hidden-import=utils.progress ^
+    --hidden-import=utils.logbuffer ^
+    --hidden-import=utils.metrics ^
+    --hidden-import=utils.video_info ^
+    --hidden-import=utils.archive ^
+    --hidden-import=utils.persistence ^
+    --hidden-import=utils.output_index ^
+    --hidden-import=utils.dedupe ^
     --hidden-import=components.silent_exit_gui_base ^
+    --hidden-import=components.job_table ^
+    --hidden-import=components.history_panel ^
     --hidden-import=config ^
     --exclude-module=_bootlocale ^
     --exclude-module=doctest ^
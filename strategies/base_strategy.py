@@ -1,6 +1,152 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import threading
+import time
+import yt_dlp
+from utils.ratelimit import get_limiter
+from utils.progress import ProgressRecord, PHASE_DOWNLOAD, PHASE_MERGE, PHASE_POSTPROCESS
+
+# 计算有效下载速度的时间窗口（秒）
+SPEED_WINDOW = 1.0
 
 class DownloadStrategy(ABC):
+    progress_callback = None
+    # 最近一次下载需要额外写入历史记录的字段
+    record_fields = {}
+
     @abstractmethod
-    def download(self, url: str, output_path: str):
-        pass
\ No newline at end of file
+    def download(self, url: str, output_path: str, info: dict = None):
+        """
+        下载单个链接
+
+        Args:
+            url: 视频链接
+            output_path: 输出文件路径
+            info: 预先提取的视频信息（extract_info 的返回值），
+                提供时直接据此下载，不再重复解析页面
+
+        Returns:
+            None 表示已全部完成；返回 concurrent.futures.Future 时表示
+            下载已完成、后处理（如转码）仍在后台进行
+        """
+        pass
+
+    @contextmanager
+    def _progress_hooks(self):
+        """
+        生成本次下载使用的 yt-dlp 进度钩子和后处理钩子
+
+        进度钩子负责全局限速（按新增字节数向共享限速器申请令牌），
+        并把数值进度写入同一个 ProgressRecord 后转发给 progress_callback；
+        只有正在传输数据的下载参与分配带宽：收到第一批数据时才在限速器中登记，
+        进入合并/转码阶段时注销（提取信息、排队和后处理期间不占用份额）；
+        后处理钩子在合并/转码开始时切换记录的阶段；
+        日志钩子统计 yt-dlp 报告的重试次数。
+
+        Yields:
+            (progress_hook, postprocessor_hook, log_hook)
+        """
+        limiter = get_limiter()
+        active = {'stream': None}
+        lock = threading.Lock()
+        record = ProgressRecord()
+        last = {'filename': None, 'bytes': 0, 'completed': 0,
+                'window_start': time.monotonic(), 'window_bytes': 0}
+
+        def hook(d):
+            if d['status'] != 'downloading':
+                return
+            with lock:
+                # 视频和音频分开下载时 filename 会变化，已完成文件的字节计入总量
+                downloaded = d.get('downloaded_bytes') or 0
+                if d.get('filename') != last['filename']:
+                    if last['filename'] is not None:
+                        last['completed'] += last['bytes']
+                    last['filename'] = d.get('filename')
+                    last['bytes'] = downloaded
+                delta = downloaded - last['bytes']
+                last['bytes'] = downloaded
+
+                # 按实际到达的字节数计算有效总速度（多连接时为所有分片之和）
+                if delta > 0:
+                    last['window_bytes'] += delta
+                now = time.monotonic()
+                elapsed = now - last['window_start']
+                if elapsed >= SPEED_WINDOW:
+                    record.speed = last['window_bytes'] / elapsed
+                    last['window_start'] = now
+                    last['window_bytes'] = 0
+                elif record.speed is None:
+                    record.speed = d.get('speed')
+
+                total = d.get('total_bytes')
+                record.total_estimated = total is None
+                if total is None:
+                    total = d.get('total_bytes_estimate')
+                record.phase = PHASE_DOWNLOAD
+                record.downloaded_bytes = last['completed'] + downloaded
+                record.total_bytes = last['completed'] + total if total else None
+                record.eta = d.get('eta')
+                record.fragment_index = d.get('fragment_index')
+                record.fragment_count = d.get('fragment_count')
+                stream = active['stream']
+                if delta > 0 and stream is None:
+                    stream = active['stream'] = limiter.register()
+            if delta > 0:
+                limiter.throttle(stream, delta)
+            if self.progress_callback:
+                self.progress_callback(record)
+
+        def postprocessor_hook(d):
+            if d['status'] != 'started':
+                return
+            with lock:
+                stream, active['stream'] = active['stream'], None
+            if stream is not None:
+                limiter.unregister(stream)
+            record.phase = PHASE_MERGE if d.get('postprocessor') == 'Merger' else PHASE_POSTPROCESS
+            record.speed = None
+            record.eta = None
+            if self.progress_callback:
+                self.progress_callback(record)
+
+        def log_hook(level, msg):
+            # 下载器和提取器的重试都以 "Retrying" 提示
+            if '. Retrying' not in msg:
+                return
+            with lock:
+                record.retries += 1
+            if self.progress_callback:
+                self.progress_callback(record)
+
+        try:
+            yield hook, postprocessor_hook, log_hook
+        finally:
+            if active['stream'] is not None:
+                limiter.unregister(active['stream'])
+
+    def _run(self, ydl, url, info=None):
+        """
+        使用已提取的信息下载，失败时回退为按链接重新解析下载
+
+        Returns:
+            下载完成后的信息字典（包含 requested_downloads）
+        """
+        if not info:
+            return ydl.extract_info(url, download=True)
+        try:
+            # 复制一份，避免 yt-dlp 修改调用方持有的信息字典
+            return ydl.process_ie_result(ydl.sanitize_info(info), download=True)
+        except (yt_dlp.utils.DownloadError, yt_dlp.utils.ReExtractInfo):
+            # 信息已过期（如直链签名失效）时重新解析
+            return ydl.extract_info(info.get('webpage_url') or url, download=True)
+
+    @staticmethod
+    def _downloaded_path(result):
+        """从下载结果中取出实际写入的文件路径"""
+        if not result:
+            return None
+        downloads = result.get('requested_downloads') or []
+        if downloads:
+            return downloads[-1].get('filepath') or downloads[-1].get('_filename')
+        return result.get('filepath') or result.get('_filename')
@@ -1,12 +1,33 @@
 from strategies.mp4_strategy import MP4DownloadStrategy
 from strategies.mp3_strategy import MP3DownloadStrategy
+from config import DEFAULT_CONCURRENT_FRAGMENTS, DEFAULT_HTTP_CHUNK_SIZE_MB, DEFAULT_PARALLEL_TRANSCODE
+
+# 音频下载类型（均由 MP3DownloadStrategy 处理，区别在于目标编码）
+AUDIO_FORMATS = ("mp3", "m4a", "opus")
+DOWNLOAD_TYPES = ("mp4",) + AUDIO_FORMATS
 
 class DownloadStrategyFactory:
     @staticmethod
-    def get_strategy(download_type: str, progress_callback=None):
+    def get_strategy(download_type: str, progress_callback=None, **options):
         if download_type == "mp4":
-            return MP4DownloadStrategy(progress_callback)
-        elif download_type == "mp3":
-            return MP3DownloadStrategy(progress_callback)
+            return MP4DownloadStrategy(progress_callback, **options)
+        elif download_type in AUDIO_FORMATS:
+            return MP3DownloadStrategy(progress_callback, audio_format=download_type, **options)
         else:
-            raise ValueError(f"未知的下载类型: {download_type}")
\ No newline at end of file
+            raise ValueError(f"未知的下载类型: {download_type}")
+
+    @staticmethod
+    def options_from_config(download_type: str, config: dict) -> dict:
+        """从配置中读取对应下载类型的策略选项"""
+        if download_type == "mp4":
+            chunk_mb = config.get("http_chunk_size_mb", DEFAULT_HTTP_CHUNK_SIZE_MB)
+            return {
+                "concurrent_fragments": config.get("concurrent_fragments", DEFAULT_CONCURRENT_FRAGMENTS),
+                "chunk_size": int(chunk_mb * 1024 * 1024) if chunk_mb else None,
+            }
+        if download_type in AUDIO_FORMATS:
+            return {
+                "parallel_transcode": config.get("parallel_transcode", DEFAULT_PARALLEL_TRANSCODE),
+                "transcode_workers": config.get("transcode_workers") or None,
+            }
+        return {}
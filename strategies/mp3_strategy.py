@@ -1,34 +1,94 @@
-import yt_dlp
 import os
 from .base_strategy import DownloadStrategy
+from utils.ydl_pool import get_pool
+from utils.transcode import get_transcode_pool, plan_audio, AUDIO_COPY
+
+# 各目标格式优先选择可直接复制的音频流
+AUDIO_FORMAT_SELECTORS = {
+    'mp3': 'bestaudio/best',
+    'm4a': 'bestaudio[ext=m4a]/bestaudio/best',
+    'opus': 'bestaudio[acodec=opus]/bestaudio/best',
+}
 
 class MP3DownloadStrategy(DownloadStrategy):
-    def __init__(self, progress_callback=None):
+    def __init__(self, progress_callback=None, parallel_transcode=False, transcode_workers=None,
+                 audio_format='mp3'):
+        """
+        Args:
+            progress_callback: 进度回调
+            parallel_transcode: 为 True 时下载完成后把转码交给共享转码池，
+                download() 立即返回 Future，不等待 ffmpeg 结束
+            transcode_workers: 转码池并发数，None 为 CPU 核数
+            audio_format: 目标格式 mp3 / m4a / opus；源音频编码与目标一致时
+                直接保留或只更换容器，不重新编码
+        """
+        if audio_format not in AUDIO_FORMAT_SELECTORS:
+            raise ValueError(f"不支持的音频格式: {audio_format}")
         self.progress_callback = progress_callback
+        self.parallel_transcode = parallel_transcode
+        self.transcode_workers = transcode_workers
+        self.audio_format = audio_format
+        self.record_fields = {}
 
-    def download(self, url: str, output_path: str):
+    def download(self, url: str, output_path: str, info: dict = None):
         ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': output_path.replace('.mp3', '.%(ext)s'),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
+            'format': AUDIO_FORMAT_SELECTORS[self.audio_format],
             'retries': 3,
             'fragment_retries': 3,
             'socket_timeout': 30,
+            'continuedl': True,  # 从已有的 .part 文件续传
             'http_headers': {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
         }
-        if self.progress_callback:
-            def hook(d):
-                if d['status'] == 'downloading':
-                    percent = d.get('_percent_str', 'N/A')
-                    speed = d.get('_speed_str', 'N/A')
-                    eta = d.get('_eta_str', 'N/A')
-                    self.progress_callback(percent, speed, eta)
-            ydl_opts['progress_hooks'] = [hook]
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
\ No newline at end of file
+        if not self.parallel_transcode:
+            # FFmpegExtractAudio 在编码一致时同样只复制音频流
+            ydl_opts['postprocessors'] = [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': self.audio_format,
+                'preferredquality': '192',
+            }]
+        outtmpl = os.path.splitext(output_path)[0] + '.%(ext)s'
+        with self._progress_hooks() as (hook, pp_hook, log_hook), \
+                get_pool().checkout(ydl_opts, outtmpl=outtmpl, progress_hook=hook,
+                                    postprocessor_hook=pp_hook, log_hook=log_hook) as ydl:
+            result = self._run(ydl, url, info)
+
+        source = self._downloaded_path(result)
+        source_codec = self._audio_codec(result)
+        if not self.parallel_transcode:
+            # 按后处理之前下载的文件判断 FFmpegExtractAudio 实际采用的方式（复制/换容器/转码）
+            mode = plan_audio(self._source_path(result) or output_path, source_codec,
+                              output_path, self.audio_format)[0]
+            self.record_fields = {'audio_path': mode}
+            return None
+
+        if not source or not os.path.exists(source):
+            raise FileNotFoundError(f"未找到已下载的音频文件: {source}")
+        mode, codec, bitrate, output_format = plan_audio(source, source_codec, output_path, self.audio_format)
+        self.record_fields = {'audio_path': mode}
+        if mode == AUDIO_COPY:
+            return None
+        return get_transcode_pool(self.transcode_workers).submit(source, output_path, codec, bitrate, output_format)
+
+    @staticmethod
+    def _source_path(result):
+        """
+        后处理之前下载的文件路径
+
+        后处理器运行后 filepath 指向处理结果，_filename 仍是下载时的文件名。
+        """
+        if not result:
+            return None
+        downloads = result.get('requested_downloads') or []
+        entry = downloads[-1] if downloads else result
+        return entry.get('_filename') or entry.get('filepath')
+
+    @staticmethod
+    def _audio_codec(result):
+        if not result:
+            return None
+        downloads = result.get('requested_downloads') or []
+        if downloads and downloads[-1].get('acodec'):
+            return downloads[-1]['acodec']
+        return result.get('acodec')
@@ -1,30 +1,35 @@
-import yt_dlp
-import os
 from .base_strategy import DownloadStrategy
+from utils.ydl_pool import get_pool
 
 class MP4DownloadStrategy(DownloadStrategy):
-    def __init__(self, progress_callback=None):
+    def __init__(self, progress_callback=None, concurrent_fragments=1, chunk_size=None):
+        """
+        Args:
+            progress_callback: 进度回调
+            concurrent_fragments: DASH/HLS 分片并发下载数（多连接模式），1 为顺序下载
+            chunk_size: 非分片格式按该大小（字节）分段请求，None 为不分段
+        """
         self.progress_callback = progress_callback
+        self.concurrent_fragments = max(1, int(concurrent_fragments or 1))
+        self.chunk_size = int(chunk_size) if chunk_size else None
 
-    def download(self, url: str, output_path: str):
+    def download(self, url: str, output_path: str, info: dict = None):
         ydl_opts = {
             'format': 'bestvideo+bestaudio/best',
-            'outtmpl': output_path,
             'merge_output_format': 'mp4',
             'retries': 3,
             'fragment_retries': 3,
             'socket_timeout': 30,
+            'continuedl': True,  # 从已有的 .part 文件续传
             'http_headers': {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
         }
-        if self.progress_callback:
-            def hook(d):
-                if d['status'] == 'downloading':
-                    percent = d.get('_percent_str', 'N/A')
-                    speed = d.get('_speed_str', 'N/A')
-                    eta = d.get('_eta_str', 'N/A')
-                    self.progress_callback(percent, speed, eta)
-            ydl_opts['progress_hooks'] = [hook]
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
\ No newline at end of file
+        if self.concurrent_fragments > 1:
+            ydl_opts['concurrent_fragment_downloads'] = self.concurrent_fragments
+        if self.chunk_size:
+            ydl_opts['http_chunk_size'] = self.chunk_size
+        with self._progress_hooks() as (hook, pp_hook, log_hook), \
+                get_pool().checkout(ydl_opts, outtmpl=output_path, progress_hook=hook,
+                                    postprocessor_hook=pp_hook, log_hook=log_hook) as ydl:
+            self._run(ydl, url, info)
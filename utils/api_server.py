@@ -0,0 +1,260 @@
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+from strategies.factory import DOWNLOAD_TYPES
+from utils.progress import ProgressAggregator, UPDATE_INTERVAL_MS
+from utils.scheduler import FINAL_STATES
+
+# 单个 SSE 订阅者最多缓存的事件数，客户端读取过慢时丢弃进度事件（状态事件不丢）
+SUBSCRIBER_QUEUE_SIZE = 256
+# SSE 空闲时发送注释行保持连接
+KEEPALIVE_SECONDS = 15
+MAX_BODY_BYTES = 1024 * 1024
+
+HTTP_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class _Subscriber:
+    def __init__(self, job_id=None):
+        self.job_id = job_id
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+
+class DownloadServer:
+    """
+    本地 HTTP 任务提交接口（asyncio，仅依赖标准库）
+
+    多个调用方共享同一个 DownloadEngine，因此共享并发上限和全局限速。
+
+    接口：
+        POST /jobs              {"url": "...", "format": "mp4", "thumbnail": false}
+                                或 {"urls": [...], ...}，返回 202 与任务列表
+        GET  /jobs              所有任务
+        GET  /jobs/<id>         单个任务
+        GET  /jobs/<id>/events  单个任务的 Server-Sent Events（任务结束后关闭）
+        GET  /events            所有任务的 Server-Sent Events
+        GET  /metrics           Prometheus 文本格式统计（启用 metrics 时）
+
+    事件格式与命令行的 JSON Lines 一致：event 为 job 或 progress。
+
+    Args:
+        engine_factory: engine_factory(progress_callback, on_update) -> DownloadEngine
+        metrics: 可选的 MetricsRecorder
+    """
+
+    def __init__(self, engine_factory, host="127.0.0.1", port=8765, metrics=None):
+        self.host = host
+        self.port = port
+        self.metrics = metrics
+        self._aggregator = ProgressAggregator()
+        self._subscribers = set()
+        self._loop = None
+        self.engine = engine_factory(self._aggregator.update, self._on_update)
+
+    async def serve_forever(self):
+        self._loop = asyncio.get_running_loop()
+        self.engine.start()
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        ticker = asyncio.ensure_future(self._progress_ticker())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            ticker.cancel()
+            self.engine.cancel()
+
+    # ---- 事件分发 ----
+
+    def _on_update(self, job):
+        """工作线程中调用，转交给事件循环"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            event = dict(event='job', **job.to_dict())
+            loop.call_soon_threadsafe(self._broadcast, job.job_id, event, True)
+
+    async def _progress_ticker(self):
+        """按界面相同的帧率合并进度事件后推送"""
+        while True:
+            await asyncio.sleep(UPDATE_INTERVAL_MS / 1000)
+            for job, record in self._aggregator.drain().items():
+                if job.state not in FINAL_STATES:
+                    self._broadcast(job.job_id, dict(event='progress', job=job.job_id, **record.to_dict()), False)
+
+    def _broadcast(self, job_id, event, important):
+        for subscriber in list(self._subscribers):
+            if subscriber.job_id is not None and subscriber.job_id != job_id:
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                if important:
+                    # 状态事件必须送达：丢掉最旧的一条腾出位置
+                    subscriber.queue.get_nowait()
+                    subscriber.queue.put_nowait(event)
+
+    # ---- HTTP ----
+
+    async def _handle(self, reader, writer):
+        try:
+            method, path, body = await self._read_request(reader)
+            await self._route(method, path, body, writer)
+        except HttpError as e:
+            await self._send_json(writer, e.status, {'error': e.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            try:
+                await self._send_json(writer, 500, {'error': str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    async def _read_request(reader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HttpError(400, "无效的请求行")
+        method, target, _ = parts
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HttpError(400, "无效的 Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "请求体过大")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), urlsplit(target).path.rstrip('/') or '/', body
+
+    async def _route(self, method, path, body, writer):
+        parts = [p for p in path.split('/') if p]
+        if parts == ['jobs']:
+            if method == 'POST':
+                return await self._send_json(writer, 202, await self._create_jobs(body))
+            if method == 'GET':
+                return await self._send_json(writer, 200, {'jobs': [job.to_dict() for job in list(self.engine.jobs)]})
+            raise HttpError(405, "不支持的方法")
+        if parts == ['events'] and method == 'GET':
+            return await self._stream_events(writer, None)
+        if parts == ['metrics'] and method == 'GET' and self.metrics is not None:
+            return await self._send(writer, 200, self.metrics.prometheus_text().encode('utf-8'),
+                                    'text/plain; version=0.0.4; charset=utf-8')
+        if len(parts) in (2, 3) and parts[0] == 'jobs' and method == 'GET':
+            job = self._find_job(parts[1])
+            if len(parts) == 2:
+                return await self._send_json(writer, 200, job.to_dict())
+            if parts[2] == 'events':
+                return await self._stream_events(writer, job)
+        raise HttpError(404, "未找到")
+
+    def _find_job(self, job_id):
+        for job in list(self.engine.jobs):
+            if str(job.job_id) == job_id:
+                return job
+        raise HttpError(404, f"任务不存在: {job_id}")
+
+    async def _create_jobs(self, body):
+        try:
+            payload = json.loads(body.decode('utf-8') or '{}')
+        except ValueError:
+            raise HttpError(400, "请求体不是有效的 JSON")
+        if not isinstance(payload, dict):
+            raise HttpError(400, "请求体应为 JSON 对象")
+        if 'urls' in payload:
+            urls = payload['urls']
+            if not isinstance(urls, list):
+                raise HttpError(400, "urls 应为链接字符串的数组")
+        elif 'url' in payload:
+            urls = [payload['url']]
+        else:
+            raise HttpError(400, "缺少 url 或 urls")
+        if not urls or not all(isinstance(u, str) and u.strip() for u in urls):
+            raise HttpError(400, "url / urls 应为非空的链接字符串")
+        download_type = payload.get('format', 'mp4')
+        if download_type not in DOWNLOAD_TYPES:
+            raise HttpError(400, f"未知的下载类型: {download_type}")
+        thumbnail = bool(payload.get('thumbnail'))
+
+        def submit():
+            jobs = []
+            for url in urls:
+                url = url.strip()
+                created = self.engine.submit(url, download_type, thumbnail=thumbnail)
+                if not created:
+                    # 重复提交时返回已有任务，调用方可以继续跟踪
+                    existing = self.engine.scheduler.find(url, download_type)
+                    created = [existing] if existing else []
+                jobs.extend(created)
+            return jobs
+
+        # 播放列表展开是阻塞操作，放到线程池中执行
+        jobs = await asyncio.get_running_loop().run_in_executor(None, submit)
+        return {'jobs': [job.to_dict() for job in jobs]}
+
+    async def _stream_events(self, writer, job):
+        subscriber = _Subscriber(job.job_id if job else None)
+        self._subscribers.add(subscriber)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\n"
+                         b"Content-Type: text/event-stream; charset=utf-8\r\n"
+                         b"Cache-Control: no-cache\r\n"
+                         b"Connection: close\r\n\r\n")
+            if job is not None:
+                # 先发送当前状态，已结束的任务直接关闭
+                self._write_event(writer, dict(event='job', **job.to_dict()))
+                if job.state in FINAL_STATES:
+                    await writer.drain()
+                    return
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                    await writer.drain()
+                    continue
+                self._write_event(writer, event)
+                await writer.drain()
+                if job is not None and event['event'] == 'job' and event['state'] in FINAL_STATES:
+                    return
+        finally:
+            self._subscribers.discard(subscriber)
+
+    @staticmethod
+    def _write_event(writer, event):
+        data = json.dumps(event, ensure_ascii=False)
+        writer.write(f"event: {event['event']}\ndata: {data}\n\n".encode('utf-8'))
+
+    async def _send_json(self, writer, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await self._send(writer, status, body, 'application/json; charset=utf-8')
+
+    @staticmethod
+    async def _send(writer, status, body, content_type):
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
@@ -0,0 +1,47 @@
+import os
+
+from utils.history import get_history, flush_history
+
+# 已下载视频的处理策略
+ARCHIVE_SKIP = "skip"      # 历史记录中有同一视频同一格式且文件仍在：跳过
+ARCHIVE_VERIFY = "verify"  # 同上，且文件大小与记录一致才跳过
+ARCHIVE_FORCE = "force"    # 总是重新下载
+ARCHIVE_POLICIES = (ARCHIVE_SKIP, ARCHIVE_VERIFY, ARCHIVE_FORCE)
+
+
+class DownloadArchive:
+    """
+    基于下载历史的已下载检查
+
+    提交任务时先把链接规范化为视频 ID，按 (视频 ID, 格式) 查询历史记录的索引，
+    命中且文件仍然存在时直接跳过，不再解析视频信息和下载。
+
+    Args:
+        store: HistoryStore，默认为共享的历史记录库
+        policy: ARCHIVE_SKIP / ARCHIVE_VERIFY / ARCHIVE_FORCE
+    """
+
+    def __init__(self, store=None, policy=ARCHIVE_SKIP):
+        if policy not in ARCHIVE_POLICIES:
+            raise ValueError(f"未知的已下载处理策略: {policy}")
+        self.store = store or get_history()
+        self.policy = policy
+
+    def lookup(self, url, download_type):
+        """已下载且符合策略时返回已有文件路径，否则返回 None"""
+        if self.policy == ARCHIVE_FORCE:
+            return None
+        flush_history()  # 刚完成、仍在合并缓冲区中的记录
+        entry = self.store.find_download(url, download_type)
+        if not entry or not entry.get('path'):
+            return None
+        path = entry['path']
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None  # 文件已被删除或移动
+        if self.policy == ARCHIVE_VERIFY:
+            expected = entry.get('size')
+            if not size or (expected is not None and size != expected):
+                return None
+        return path
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+from utils.persistence import atomic_write
+
+# 不参与下载、体积却很大的字段，写入缓存前剔除
+DROPPED_KEYS = ('automatic_captions', 'heatmap', 'thumbnails')
+
+# 直链签名过期前预留的余量（秒）
+EXPIRE_MARGIN = 600
+
+
+class MetadataCache:
+    """
+    视频信息磁盘缓存
+
+    以视频ID为键，每个条目保存为 <缓存目录>/<视频ID>.json。
+    条目在 TTL 到期或其中直链签名即将过期时失效；总大小超过上限时
+    按最近访问时间（文件 mtime）淘汰最久未使用的条目。
+    """
+
+    def __init__(self, cache_dir, ttl=5 * 3600, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _path(self, video_id):
+        return os.path.join(self.cache_dir, f"{video_id}.json")
+
+    def get(self, video_id):
+        """读取缓存的信息字典，不存在或已过期时返回 None"""
+        path = self._path(video_id)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('expires', 0) <= time.time():
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # 更新访问时间，用于 LRU 淘汰
+        except OSError:
+            pass
+        return entry.get('info')
+
+    def put(self, video_id, info):
+        """写入信息字典"""
+        info = {k: v for k, v in info.items() if k not in DROPPED_KEYS}
+        entry = {
+            'expires': self._expires_at(info),
+            'info': info,
+        }
+        try:
+            data = json.dumps(entry, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            return
+        path = self._path(video_id)
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                old_size = os.path.getsize(path) if os.path.exists(path) else 0
+                atomic_write(path, data)
+            except OSError:
+                return
+            if self._total_bytes is not None:
+                self._total_bytes += len(data.encode('utf-8')) - old_size
+            self._evict()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for name, _, _ in self._entries():
+                self._remove(os.path.join(self.cache_dir, name))
+            self._total_bytes = 0
+
+    def _expires_at(self, info):
+        expires = time.time() + self.ttl
+        # YouTube 直链带有 expire 参数，过期后缓存的 formats 无法直接下载
+        for fmt in info.get('formats') or []:
+            url = fmt.get('url')
+            if not url:
+                continue
+            expire = parse_qs(urlparse(url).query).get('expire', [None])[0]
+            if expire and expire.isdigit():
+                expires = min(expires, int(expire) - EXPIRE_MARGIN)
+            break
+        return expires
+
+    def _entries(self):
+        """返回 (文件名, 大小, mtime) 列表"""
+        result = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith('.json'):
+                        st = entry.stat()
+                        result.append((entry.name, st.st_size, st.st_mtime))
+        except OSError:
+            pass
+        return result
+
+    def _evict(self):
+        """总大小超过上限时淘汰最久未访问的条目（需持有锁）"""
+        if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+            return
+        entries = self._entries()
+        self._total_bytes = sum(size for _, size, _ in entries)
+        if self._total_bytes <= self.max_bytes:
+            return
+        for name, size, _ in sorted(entries, key=lambda e: e[2]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if self._remove(os.path.join(self.cache_dir, name)):
+                self._total_bytes -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
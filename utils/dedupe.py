@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+
+from utils.history import get_history
+from utils.video_info import print_log
+
+# 内容重复的处理方式
+DEDUPE_OFF = "off"            # 不计算哈希
+DEDUPE_HARDLINK = "hardlink"  # 新文件替换为指向已有文件的硬链接，文件名不变
+DEDUPE_SKIP = "skip"          # 删除新文件，只保留已有文件
+DEDUPE_MODES = (DEDUPE_OFF, DEDUPE_HARDLINK, DEDUPE_SKIP)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 查找、登记和替换文件需要一起完成，同时结束的两个相同文件才能被识别
+_lock = threading.Lock()
+
+
+def hash_file(path, chunk_size=HASH_CHUNK_SIZE):
+    """分块计算文件的 SHA-256，不把整个文件读入内存"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Deduplicator:
+    """
+    下载完成后按内容去重
+
+    不同链接（短链接、移动版链接、重新上传）常常得到完全相同的文件。
+    计算完成文件的哈希，与历史记录库中的内容索引比较：内容相同且已有文件仍在时，
+    按 mode 改为硬链接或删除新文件，历史记录指向已有文件。
+
+    Args:
+        store: HistoryStore，默认为共享的历史记录库
+        mode: DEDUPE_OFF / DEDUPE_HARDLINK / DEDUPE_SKIP
+    """
+
+    def __init__(self, store=None, mode=DEDUPE_OFF, log=print_log):
+        if mode not in DEDUPE_MODES:
+            raise ValueError(f"未知的去重方式: {mode}")
+        self.store = store or get_history()
+        self.mode = mode
+        self.log = log
+
+    def process(self, path, metrics=None):
+        """
+        处理一个完成的文件
+
+        Args:
+            metrics: 可选的 JobMetrics，记录哈希耗时
+
+        Returns:
+            (历史记录应指向的路径, 追加到历史记录的字段)
+        """
+        if self.mode == DEDUPE_OFF or not path:
+            return path, {}
+        try:
+            if metrics is not None:
+                with metrics.span("dedupe"):
+                    return self._process(path)
+            return self._process(path)
+        except OSError as e:
+            self.log(f"[去重] 处理失败，保留下载的文件: {e}", "error")
+            return path, {}
+
+    def _process(self, path):
+        store = self.store
+        size = os.path.getsize(path)
+        digest = hash_file(path)
+        fields = {"content_hash": digest}
+        with _lock:
+            entry = store.find_content(digest)
+            canonical = entry["path"] if entry else None
+            if canonical and (os.path.abspath(canonical) == os.path.abspath(path)
+                              or not os.path.isfile(canonical) or os.path.getsize(canonical) != size):
+                canonical = None  # 同一个文件被重新下载，或已有文件已被删除、修改
+            if canonical is None:
+                store.add_content(digest, size, path)
+                return path, fields
+            if os.path.samefile(canonical, path):
+                return canonical, fields  # 已经是硬链接
+            name = os.path.basename(path)
+            if self.mode == DEDUPE_SKIP:
+                os.remove(path)
+                self.log(f"[去重] 与已有文件内容相同，已删除: {name} → {canonical}")
+                return canonical, fields
+            # 先在同目录创建硬链接再替换，任何时刻 path 都是完整的文件
+            tmp_path = f"{path}.dedupe.tmp"
+            try:
+                if os.path.lexists(tmp_path):
+                    os.remove(tmp_path)
+                os.link(canonical, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                # 跨分区或文件系统不支持硬链接
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                self.log(f"[去重] 无法创建硬链接，保留下载的文件: {e}")
+                return path, fields
+            self.log(f"[去重] 与已有文件内容相同，已改为硬链接: {name} → {canonical}")
+            fields["linked_path"] = path
+            return canonical, fields
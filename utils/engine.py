@@ -0,0 +1,145 @@
+import threading
+
+from config import (load_config, app_path, DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST_LIMIT, DEFAULT_CACHE_DIR,
+                    DEFAULT_CACHE_TTL, DEFAULT_CACHE_MAX_MB, DEFAULT_ARCHIVE_POLICY, DEFAULT_DEDUPE)
+from strategies.factory import DownloadStrategyFactory, DOWNLOAD_TYPES
+from utils.archive import DownloadArchive
+from utils.cache import MetadataCache
+from utils.dedupe import Deduplicator
+from utils.history import add_download_record
+from utils.journal import job_key
+from utils.output_index import get_output_index
+from utils.playlist import is_collection_url, iter_playlist_entries
+from utils.scheduler import BatchScheduler
+from utils.video_info import get_video_info, download_thumbnail, output_filename, print_log
+
+
+class DownloadEngine:
+    """
+    不依赖界面的下载引擎
+
+    封装 BatchScheduler 以及解析信息、生成文件名、下载封面、去重、写历史记录等步骤，
+    供界面的批量下载、命令行和 HTTP 服务共用。任务在 start() 之后可以持续提交，
+    close() 后队列取空即结束。
+
+    Args:
+        download_dir: 输出目录
+        config: 配置字典，默认读取 config.json
+        progress_callback: progress_callback(job, record)
+        on_update: on_update(job)，任务状态变化时调用
+        on_prepared: on_prepared(job)，任务的视频信息解析完成（job.video_info 可用）时调用
+        log: log(message, color=None)
+        max_workers / per_host_limit: 默认取配置值
+        metrics: 可选的 MetricsRecorder
+        journal: 可选的 JobJournal
+        archive_policy: 历史记录中已下载视频的处理策略，默认取配置值
+        dedupe: 完成文件的内容去重方式，默认取配置值
+        metadata_cache: 可选的 MetadataCache，默认按配置新建
+    """
+
+    def __init__(self, download_dir, config=None, progress_callback=None, on_update=None,
+                 log=print_log, max_workers=None, per_host_limit=None, metrics=None, journal=None,
+                 archive_policy=None, dedupe=None, on_prepared=None, metadata_cache=None):
+        if config is None:
+            config = load_config()
+        self.download_dir = download_dir
+        self.log = log
+        self.on_prepared = on_prepared
+        self.metadata_cache = metadata_cache or MetadataCache(
+            app_path(config.get("metadata_cache_dir", DEFAULT_CACHE_DIR)),
+            ttl=config.get("metadata_cache_ttl", DEFAULT_CACHE_TTL),
+            max_bytes=config.get("metadata_cache_max_mb", DEFAULT_CACHE_MAX_MB) * 1024 * 1024
+        )
+        self.output_index = get_output_index(download_dir)
+        self._thumbnail_jobs = set()
+        self.deduplicator = Deduplicator(mode=dedupe or config.get("dedupe", DEFAULT_DEDUPE), log=log)
+        self._lock = threading.Lock()
+        self.scheduler = BatchScheduler(
+            self._prepare, self._finish,
+            progress_callback=progress_callback,
+            on_update=on_update,
+            max_workers=max_workers or config.get("max_workers", DEFAULT_MAX_WORKERS),
+            per_host_limit=per_host_limit or config.get("per_host_limit", DEFAULT_PER_HOST_LIMIT),
+            journal=journal,
+            metrics=metrics,
+            archive=DownloadArchive(policy=archive_policy or config.get("archive_policy", DEFAULT_ARCHIVE_POLICY)),
+            strategy_options={t: DownloadStrategyFactory.options_from_config(t, config)
+                              for t in DOWNLOAD_TYPES},
+        )
+
+    @property
+    def jobs(self):
+        return self.scheduler.jobs
+
+    def start(self):
+        self.scheduler.start()
+
+    def submit(self, url, download_type, thumbnail=False):
+        """
+        提交一个链接，播放列表/频道逐个展开后提交（阻塞到展开完成）
+
+        Returns:
+            新建的 DownloadJob 列表（重复的视频不会再次提交）
+        """
+        if download_type not in DOWNLOAD_TYPES:
+            raise ValueError(f"未知的下载类型: {download_type}")
+        if not is_collection_url(url):
+            jobs = [self._submit(url, download_type, thumbnail)]
+        else:
+            self.log(f"[播放列表] 开始展开: {url}")
+            jobs = []
+            try:
+                for entry_url, _ in iter_playlist_entries(url):
+                    jobs.append(self._submit(entry_url, download_type, thumbnail))
+            except RuntimeError:
+                raise  # 引擎已关闭
+            except Exception as e:
+                self.log(f"[播放列表] 展开失败: {e}", "error")
+            count = sum(1 for job in jobs if job)
+            self.log(f"[播放列表] 展开完成: {count} 个视频，跳过重复 {len(jobs) - count} 个")
+        return [job for job in jobs if job]
+
+    def _submit(self, url, download_type, thumbnail):
+        # 提交前登记，工作线程可能立即开始处理该任务
+        if thumbnail:
+            with self._lock:
+                self._thumbnail_jobs.add(job_key(url, download_type))
+        return self.scheduler.submit(url, download_type)
+
+    def close(self):
+        """不再接受新任务"""
+        self.scheduler.close()
+
+    def cancel(self):
+        self.scheduler.cancel()
+
+    def wait(self, timeout=None):
+        self.scheduler.wait(timeout)
+
+    def counts(self):
+        return self.scheduler.counts()
+
+    def _prepare(self, job):
+        with job.metrics.span("extract"):
+            video_info = get_video_info(job.url, self.metadata_cache, self.log)
+        job.video_info = video_info
+        if job.output_file:
+            # 恢复的任务沿用原文件名，以便续传 .part 文件
+            self.output_index.add(job.output_file)
+        else:
+            job.output_file = self.output_index.reserve(output_filename(video_info, job.download_type))
+        if self.on_prepared:
+            self.on_prepared(job)
+        with self._lock:
+            thumbnail = job_key(job.url, job.download_type) in self._thumbnail_jobs
+        if thumbnail:
+            path = download_thumbnail(video_info, self.download_dir, self.log, job.metrics)
+            if path:
+                self.output_index.add(path)
+
+    def _finish(self, job):
+        job.output_file, fields = self.deduplicator.process(job.output_file, job.metrics)
+        job.record_fields.update(fields)
+        title = job.title or 'Unknown'
+        add_download_record(title, job.download_type, job.output_file, job.url,
+                            uploader=(job.video_info or {}).get('uploader'), **job.record_fields)
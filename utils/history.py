@@ -1,20 +1,516 @@
+import atexit
+import gzip
 import json
 import os
-from datetime import datetime
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
 
-HISTORY_FILE = "history.json"
+from config import (get_config, app_path, legacy_path, DEFAULT_FLUSH_INTERVAL_MS, DEFAULT_FLUSH_MAX_RECORDS,
+                    DEFAULT_HISTORY_MAX_ROWS, DEFAULT_HISTORY_MAX_AGE_DAYS)
+from utils.persistence import WriteCoalescer, atomic_write, fsync_enabled
+from utils.urls import extract_video_id
 
-def load_history():
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+HISTORY_DB = app_path("history.db")
+# 旧版历史记录（整个文件重写的 JSON 列表），首次打开数据库时自动导入
+HISTORY_FILE = app_path("history.json")
+# 轮转出的旧记录，每月一个 gzip 压缩的 JSON Lines 文件（YYYY-MM.jsonl.gz）
+HISTORY_ARCHIVE_DIR = app_path("history_archive")
+# 时间无法识别的旧记录所在的归档文件
+UNDATED_SEGMENT = "undated"
 
-def save_history(entries):
-    with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(entries, f, ensure_ascii=False, indent=2)
+SCHEMA_VERSION = 4
 
-def add_download_record(title, format_type, path, url):
+# 有独立列的字段，其余字段存入 extra（JSON）
+COLUMNS = ("timestamp", "title", "format", "path", "url", "video_id", "uploader", "size")
+
+# query() 允许的排序字段
+SORT_FIELDS = ("timestamp", "title", "format", "uploader", "size")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    title     TEXT,
+    format    TEXT,
+    path      TEXT,
+    url       TEXT,
+    video_id  TEXT,
+    uploader  TEXT,
+    size      INTEGER,
+    extra     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_video_id ON downloads (video_id, format);
+CREATE INDEX IF NOT EXISTS idx_downloads_url ON downloads (url);
+CREATE INDEX IF NOT EXISTS idx_downloads_timestamp ON downloads (timestamp);
+CREATE INDEX IF NOT EXISTS idx_downloads_format ON downloads (format);
+CREATE INDEX IF NOT EXISTS idx_downloads_uploader ON downloads (uploader, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS archived (
+    id        INTEGER PRIMARY KEY,
+    timestamp TEXT,
+    format    TEXT,
+    path      TEXT,
+    url       TEXT,
+    video_id  TEXT,
+    size      INTEGER,
+    segment   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_archived_video_id ON archived (video_id, format);
+CREATE INDEX IF NOT EXISTS idx_archived_url ON archived (url);
+CREATE TABLE IF NOT EXISTS content_hashes (
+    digest TEXT PRIMARY KEY,
+    size   INTEGER NOT NULL,
+    path   TEXT NOT NULL
+);
+"""
+
+# 读取归档时使用的临时表（只存在于当前连接）
+ARCHIVE_VIEW_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS archived_rows (
+    id        INTEGER PRIMARY KEY,
+    timestamp TEXT,
+    title     TEXT,
+    format    TEXT,
+    path      TEXT,
+    url       TEXT,
+    video_id  TEXT,
+    uploader  TEXT,
+    size      INTEGER,
+    extra     TEXT,
+    segment   TEXT
+);
+"""
+
+ROW_FIELDS = ("id",) + COLUMNS + ("extra",)
+
+
+class HistoryStore:
+    """
+    下载历史记录（SQLite，WAL 模式）
+
+    每条记录一次插入，不再读取和重写整个文件；按视频 ID、链接、时间和格式建有索引。
+    WAL 模式下写入不阻塞读取，进程崩溃最多丢失最后一条未提交的记录。
+
+    记录数超过 max_rows 或早于 max_age_days 天的记录由 rotate() 移入按月压缩的
+    归档文件，数据库中只保留近期记录和归档记录的精简索引（视频 ID、格式、路径），
+    已下载检查仍能命中归档记录。查询时传入 include_archived=True 才读取归档。
+
+    Args:
+        path: 数据库文件
+        legacy_path: 旧版 history.json，存在时在首次打开时导入，
+            导入后重命名为 history.json.migrated
+        archive_dir: 归档目录
+        max_rows: 保留在数据库中的最多记录数，None 表示不限
+        max_age_days: 保留在数据库中的记录天数，None 表示不限
+    """
+
+    def __init__(self, path=HISTORY_DB, legacy_path=HISTORY_FILE, archive_dir=HISTORY_ARCHIVE_DIR,
+                 max_rows=None, max_age_days=None):
+        self.path = path
+        self.archive_dir = archive_dir
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._rotate_lock = threading.Lock()
+        self._loaded_segments = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # fsync 策略开启时每次提交都落盘，否则只在 WAL 检查点时落盘
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync_enabled() else 'NORMAL'}")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            self._upgrade()
+        self._conn.executescript(ARCHIVE_VIEW_SCHEMA)
+        if legacy_path and os.path.exists(legacy_path):
+            self.migrate_json(legacy_path)
+        self._hot_rows = self.count()
+
+    def _upgrade(self):
+        """按 schema_version 升级旧数据库（需在事务中调用）"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        version = int(row[0]) if row else SCHEMA_VERSION
+        if version < 2:
+            self._conn.execute("ALTER TABLE downloads ADD COLUMN size INTEGER")
+        # 版本 3 新增的 archived 表、版本 4 新增的 content_hashes 表由 SCHEMA 创建
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                           (str(SCHEMA_VERSION),))
+
+    @staticmethod
+    def _row_params(entry):
+        entry = dict(entry)
+        if not entry.get('video_id'):
+            entry['video_id'] = extract_video_id(entry.get('url') or '')
+        extra = {k: v for k, v in entry.items() if k not in COLUMNS}
+        return tuple(entry.get(k) for k in COLUMNS) + (json.dumps(extra, ensure_ascii=False) if extra else None,)
+
+    @staticmethod
+    def _row_to_dict(row):
+        entry = {k: row[k] for k in COLUMNS if row[k] is not None}
+        entry['id'] = row['id']
+        if row['extra']:
+            try:
+                entry.update(json.loads(row['extra']))
+            except ValueError:
+                pass
+        return entry
+
+    def add(self, entry):
+        """追加一条记录，返回记录 ID"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO downloads (timestamp, title, format, path, url, video_id, uploader, size, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._row_params(entry))
+            self._hot_rows += 1
+        self._maybe_rotate()
+        return cursor.lastrowid
+
+    def add_many(self, entries):
+        """在一个事务中追加多条记录"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO downloads (timestamp, title, format, path, url, video_id, uploader, size, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [self._row_params(e) for e in entries])
+            self._hot_rows += len(entries)
+        self._maybe_rotate()
+
+    def find_download(self, url, format_type):
+        """按视频 ID（无法识别时按链接）查找同一格式的最近一条记录，没有则返回 None"""
+        video_id = extract_video_id(url)
+        with self._lock:
+            if video_id:
+                row = self._conn.execute(
+                    "SELECT * FROM downloads WHERE video_id = ? AND format = ? ORDER BY id DESC LIMIT 1",
+                    (video_id, format_type)).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT * FROM downloads WHERE url = ? AND format = ? ORDER BY id DESC LIMIT 1",
+                    (url, format_type)).fetchone()
+            if row:
+                return self._row_to_dict(row)
+            # 已轮转到归档的记录：只返回索引中的字段
+            field, value = ("video_id", video_id) if video_id else ("url", url)
+            row = self._conn.execute(
+                f"SELECT * FROM archived WHERE {field} = ? AND format = ? ORDER BY id DESC LIMIT 1",
+                (value, format_type)).fetchone()
+        if not row:
+            return None
+        return {k: row[k] for k in row.keys() if row[k] is not None}
+
+    def find_content(self, digest):
+        """按内容哈希查找已登记的文件，返回 {'digest', 'size', 'path'} 或 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM content_hashes WHERE digest = ?", (digest,)).fetchone()
+        return dict(row) if row else None
+
+    def add_content(self, digest, size, path):
+        """登记（或替换）某一内容的保留文件"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO content_hashes (digest, size, path) VALUES (?, ?, ?)",
+                               (digest, size, path))
+
+    def query(self, start=None, end=None, format_type=None, uploader=None, title=None,
+              sort="timestamp", descending=True, limit=50, offset=0, include_archived=False):
+        """
+        按条件分页查询历史记录
+
+        Args:
+            start / end: 时间范围（'YYYY-MM-DD' 或 'YYYY-MM-DD HH:MM:SS'，包含两端）
+            format_type: 下载格式
+            uploader: 频道（完全匹配）
+            title: 标题包含的文字
+            sort: SORT_FIELDS 之一
+            descending: 是否降序
+            limit / offset: 分页
+            include_archived: 是否同时查询归档记录（按时间范围只读取相关月份的归档文件）
+
+        Returns:
+            (记录列表, 符合条件的总数)
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort}")
+        conditions = []
+        params = []
+        if start:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            conditions.append("timestamp <= ?")
+            # 只给日期时包含当天全部记录
+            params.append(f"{end} 23:59:59" if len(end) == 10 else end)
+        if format_type:
+            conditions.append("format = ?")
+            params.append(format_type)
+        if uploader:
+            conditions.append("uploader = ?")
+            params.append(uploader)
+        if title:
+            conditions.append("title LIKE ? ESCAPE '\\'")
+            escaped = title.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = f" ORDER BY {sort} {'DESC' if descending else 'ASC'}, id {'DESC' if descending else 'ASC'}"
+        with self._lock:
+            source = self._source(start, end) if include_archived else "downloads"
+            total = self._conn.execute(f"SELECT COUNT(*) FROM {source}{where}", params).fetchone()[0]
+            rows = self._conn.execute(f"SELECT * FROM {source}{where}{order} LIMIT ? OFFSET ?",
+                                      params + [int(limit), int(offset)]).fetchall()
+        return [self._row_to_dict(row) for row in rows], total
+
+    def uploaders(self, limit=200):
+        """记录中出现过的频道（按最近下载排序），供筛选下拉框使用"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT uploader FROM downloads WHERE uploader IS NOT NULL AND uploader != '' "
+                "GROUP BY uploader ORDER BY MAX(timestamp) DESC LIMIT ?", (limit,)).fetchall()
+        return [row[0] for row in rows]
+
+    def all(self, include_archived=False):
+        """按时间顺序返回全部记录"""
+        with self._lock:
+            source = self._source() if include_archived else "downloads"
+            rows = self._conn.execute(f"SELECT * FROM {source} ORDER BY id").fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def count(self, include_archived=False):
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+            if include_archived:
+                total += self._conn.execute("SELECT COUNT(*) FROM archived").fetchone()[0]
+            return total
+
+    # ---------- 轮转与归档 ----------
+
+    def _segment_path(self, segment):
+        return os.path.join(self.archive_dir, f"{segment}.jsonl.gz")
+
+    @staticmethod
+    def _segment_name(month):
+        """'YYYY-MM' 之外的时间（旧版导入的空时间等）统一归入 undated"""
+        if len(month) == 7 and month[4] == '-' and month[:4].isdigit() and month[5:].isdigit():
+            return month
+        return UNDATED_SEGMENT
+
+    def segments(self):
+        """已有的归档文件名（不含扩展名），按时间排序"""
+        try:
+            names = os.listdir(self.archive_dir)
+        except OSError:
+            return []
+        return sorted(n[:-len(".jsonl.gz")] for n in names if n.endswith(".jsonl.gz"))
+
+    def _read_segment(self, segment):
+        """读取归档文件，返回 {记录 ID: 原始行}"""
+        rows = {}
+        try:
+            with gzip.open(self._segment_path(segment), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                        rows[row["id"]] = row
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except (OSError, EOFError):
+            pass
+        return rows
+
+    def _write_segment(self, segment, rows):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        lines = "".join(json.dumps(rows[i], ensure_ascii=False) + "\n" for i in sorted(rows))
+        atomic_write(self._segment_path(segment), gzip.compress(lines.encode('utf-8')))
+
+    def _maybe_rotate(self):
+        # 超出上限一定余量后才轮转，避免每次写入都触发；正在轮转时不等待
+        if (self.max_rows and self._hot_rows > self.max_rows + max(100, self.max_rows // 10)
+                and not self._rotate_lock.locked()):
+            self.rotate()
+
+    def rotate(self):
+        """
+        把超出 max_rows 或早于 max_age_days 的记录移入按月归档文件，返回移动的记录数
+
+        每个月份单独处理：先原子写入合并后的归档文件，再在一个事务中删除原记录并写入
+        归档索引。中途中断时归档文件与数据库可能同时有同一条记录（按 ID 去重），
+        不会丢失记录。移动后整理数据库文件，释放空间。
+        """
+        if not self.max_rows and not self.max_age_days:
+            return 0
+        with self._rotate_lock:
+            conditions = []
+            params = []
+            with self._lock:
+                if self.max_age_days:
+                    cutoff = datetime.now() - timedelta(days=self.max_age_days)
+                    conditions.append("timestamp < ?")
+                    params.append(cutoff.strftime("%Y-%m-%d %H:%M:%S"))
+                if self.max_rows:
+                    row = self._conn.execute("SELECT id FROM downloads ORDER BY id DESC LIMIT 1 OFFSET ?",
+                                             (self.max_rows,)).fetchone()
+                    if row:
+                        conditions.append("id <= ?")
+                        params.append(row[0])
+                if not conditions:
+                    return 0
+                where = " OR ".join(conditions)
+                months = [r[0] or "" for r in self._conn.execute(
+                    f"SELECT DISTINCT substr(timestamp, 1, 7) FROM downloads WHERE {where}", params)]
+            moved = 0
+            for month in months:
+                moved += self._archive_month(month, where, params)
+            if moved:
+                with self._lock:
+                    self._hot_rows = self._conn.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+                    self._conn.execute("VACUUM")
+            return moved
+
+    def _archive_month(self, month, where, params):
+        segment = self._segment_name(month)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM downloads WHERE ({where}) AND coalesce(substr(timestamp, 1, 7), '') = ?",
+                params + [month]).fetchall()
+        if not rows:
+            return 0
+        archived = self._read_segment(segment)
+        for row in rows:
+            archived[row["id"]] = {k: row[k] for k in ROW_FIELDS}
+        self._write_segment(segment, archived)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO archived (id, timestamp, format, path, url, video_id, size, segment) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(r["id"], r["timestamp"], r["format"], r["path"], r["url"], r["video_id"], r["size"], segment)
+                 for r in rows])
+            self._conn.executemany("DELETE FROM downloads WHERE id = ?", [(r["id"],) for r in rows])
+        self._loaded_segments.pop(segment, None)
+        return len(rows)
+
+    def _source(self, start=None, end=None):
+        """
+        读取时间范围内的归档文件到临时表，返回合并近期记录与归档记录的子查询（需持有锁）
+
+        已读取且未变化的归档文件不会重复读取。
+        """
+        wanted = [s for s in self.segments()
+                  if (s == UNDATED_SEGMENT and not start)
+                  or (s != UNDATED_SEGMENT and (not start or s >= start[:7]) and (not end or s <= end[:7]))]
+        for segment in wanted:
+            try:
+                stamp = os.stat(self._segment_path(segment)).st_mtime_ns
+            except OSError:
+                continue
+            if self._loaded_segments.get(segment) == stamp:
+                continue
+            with self._conn:
+                self._conn.execute("DELETE FROM temp.archived_rows WHERE segment = ?", (segment,))
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO temp.archived_rows ({', '.join(ROW_FIELDS)}, segment) "
+                    f"VALUES ({', '.join('?' * (len(ROW_FIELDS) + 1))})",
+                    [tuple(row.get(k) for k in ROW_FIELDS) + (segment,)
+                     for row in self._read_segment(segment).values()])
+            self._loaded_segments[segment] = stamp
+        fields = ", ".join(ROW_FIELDS)
+        return (f"(SELECT {fields} FROM downloads UNION ALL "
+                f"SELECT {fields} FROM temp.archived_rows WHERE id NOT IN (SELECT id FROM downloads))")
+
+    def migrate_json(self, legacy_path):
+        """
+        导入旧版 history.json，返回导入的记录数
+
+        导入与标记在同一事务中完成；导入成功后把旧文件重命名，避免重复导入。
+        """
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        entries = [e for e in entries if isinstance(e, dict)] if isinstance(entries, list) else []
+        for entry in entries:
+            entry.setdefault('timestamp', '')
+        with self._lock, self._conn:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+            if not done:
+                self._conn.executemany(
+                    "INSERT INTO downloads (timestamp, title, format, path, url, video_id, uploader, size, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [self._row_params(e) for e in entries])
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)",
+                                   (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+        try:
+            os.replace(legacy_path, legacy_path + ".migrated")
+        except OSError:
+            pass
+        return 0 if done else len(entries)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+_writer = None
+
+
+def get_history():
+    """返回进程内共享的历史记录库"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            config = get_config()
+            # 旧版从其他目录启动时把 history.json 写在了工作目录中
+            legacy = HISTORY_FILE if os.path.exists(HISTORY_FILE) else (legacy_path("history.json") or HISTORY_FILE)
+            _store = HistoryStore(legacy_path=legacy,
+                                  max_rows=config.get("history_max_rows", DEFAULT_HISTORY_MAX_ROWS),
+                                  max_age_days=config.get("history_max_age_days", DEFAULT_HISTORY_MAX_AGE_DAYS))
+            # 启动时在后台轮转（首次导入大量旧记录后也在这里归档）
+            threading.Thread(target=_store.rotate, name="history-rotate", daemon=True).start()
+        return _store
+
+
+def _history_writer():
+    """
+    合并写入历史记录
+
+    批量下载中短时间内完成的多条记录在一个事务中插入。
+    缓冲的记录在查询前、进程退出时（atexit）写入。
+    """
+    global _writer
+    with _store_lock:
+        if _writer is None:
+            config = get_config()
+            _writer = WriteCoalescer(
+                lambda entries: get_history().add_many(entries),
+                max_delay_ms=config.get("flush_interval_ms", DEFAULT_FLUSH_INTERVAL_MS),
+                max_items=config.get("flush_max_records", DEFAULT_FLUSH_MAX_RECORDS),
+                on_error=lambda e: print(f"[错误] 写入下载历史失败: {e}", file=sys.stderr),
+                name="history")
+            atexit.register(flush_history)
+        return _writer
+
+
+def flush_history():
+    """立即写入尚未写入的历史记录"""
+    if _writer is not None:
+        _writer.flush()
+
+
+def load_history(include_archived=False):
+    flush_history()
+    return get_history().all(include_archived)
+
+
+def query_history(**filters):
+    """按条件分页查询历史记录，参数见 HistoryStore.query，返回 (记录列表, 总数)"""
+    flush_history()
+    return get_history().query(**filters)
+
+
+def add_download_record(title, format_type, path, url, **extra):
     entry = {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "title": title,
@@ -22,6 +518,9 @@ def add_download_record(title, format_type, path, url):
         "path": path,
         "url": url
     }
-    entries = load_history()
-    entries.append(entry)
-    save_history(entries)
\ No newline at end of file
+    entry.update(extra)  # 如音频处理方式 audio_path、频道 uploader
+    try:
+        entry.setdefault("size", os.path.getsize(path))
+    except (OSError, TypeError):
+        pass
+    _history_writer().add(entry)
@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from config import app_path
+from utils.urls import extract_video_id
+
+JOURNAL_FILE = app_path("job_journal.jsonl")
+
+
+def job_key(url, download_type):
+    """任务的唯一键：同一视频同一格式视为同一任务"""
+    return f"{download_type}:{extract_video_id(url) or url}"
+
+
+class JobJournal:
+    """
+    批量下载任务日志（JSON Lines，只追加）
+
+    每次任务状态变化追加一行，程序崩溃或被关闭后重启时回放日志，
+    得到上次批量下载的链接列表和每个任务的最终状态：
+    已完成的任务直接跳过，未完成的任务沿用原输出路径，
+    yt-dlp 会从已有的 .part 文件继续下载。
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._batch = None
+        self._jobs = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return
+        for line in data.decode('utf-8', errors='replace').splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # 崩溃时写了一半的行
+            if record.get('type') == 'batch':
+                self._batch = record
+                self._jobs = {}
+            elif record.get('type') == 'expanded' and self._batch:
+                self._batch['expanded'] = True
+            elif record.get('type') == 'job':
+                self._jobs[record['key']] = record
+        if data and not data.endswith(b'\n'):
+            self._repair_tail(data)
+
+    def _repair_tail(self, data):
+        """
+        处理崩溃时留下的不完整末行，之后追加的记录从新的一行开始
+
+        末行是完整的 JSON（只缺换行符）时补上换行，否则截掉这一段。
+        """
+        tail = data[data.rfind(b'\n') + 1:]
+        try:
+            json.loads(tail.decode('utf-8'))
+            complete = True
+        except ValueError:
+            complete = False
+        try:
+            if complete:
+                with open(self.path, 'ab') as f:
+                    f.write(b'\n')
+            else:
+                with open(self.path, 'r+b') as f:
+                    f.truncate(len(data) - len(tail))
+        except OSError:
+            pass
+
+    def _append(self, record):
+        """追加一行并立即刷新到磁盘（需持有锁）"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def pending_batch(self):
+        """返回上次未完成的批量任务 (链接列表, 格式, 是否下载封面)，没有则返回 None"""
+        with self._lock:
+            if not self._batch:
+                return None
+            done = sum(1 for r in self._jobs.values() if r.get('state') == 'done')
+            if self._jobs and done == len(self._jobs) and self._batch.get('expanded'):
+                return None
+            return self._batch['urls'], self._batch['format'], self._batch.get('thumbnail', False)
+
+    def start_batch(self, urls, download_type, download_thumb=False):
+        """
+        开始一个批量任务
+
+        与日志中未完成的批量任务相同时继续沿用已有记录（恢复），
+        否则清空日志重新开始。返回是否为恢复。
+        """
+        with self._lock:
+            resumed = bool(self._batch and self._batch['urls'] == list(urls)
+                           and self._batch['format'] == download_type)
+            if not resumed:
+                self._close_file()
+                self._jobs = {}
+                self._batch = {
+                    'type': 'batch',
+                    'urls': list(urls),
+                    'format': download_type,
+                    'thumbnail': download_thumb,
+                    'ts': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                }
+                # 新批量任务覆盖旧日志
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(self._batch, ensure_ascii=False) + '\n')
+            return resumed
+
+    def mark_expanded(self):
+        """所有输入链接（包括播放列表）都已提交"""
+        with self._lock:
+            if self._batch is not None:
+                self._batch['expanded'] = True
+                self._append({'type': 'expanded'})
+
+    def lookup(self, url, download_type):
+        """查询任务的最后记录"""
+        with self._lock:
+            return self._jobs.get(job_key(url, download_type))
+
+    def record(self, job):
+        """记录任务的当前状态和输出路径"""
+        key = job_key(job.url, job.download_type)
+        record = {
+            'type': 'job',
+            'key': key,
+            'url': job.url,
+            'state': job.state,
+            'output_file': job.output_file,
+        }
+        with self._lock:
+            previous = self._jobs.get(key)
+            if previous and previous.get('state') == record['state'] \
+                    and previous.get('output_file') == record['output_file']:
+                return
+            self._jobs[key] = record
+            self._append(record)
+
+    def finish_batch(self):
+        """批量任务全部完成后删除日志"""
+        with self._lock:
+            self._close_file()
+            self._batch = None
+            self._jobs = {}
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close_file()
@@ -0,0 +1,76 @@
+import logging
+import os
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from config import app_path
+
+LOG_FILE = app_path("logs", "downloader.log")
+
+
+class LogBuffer:
+    """
+    有界的日志缓冲
+
+    任意线程调用 append() 只把日志行放入队列并写入滚动日志文件，
+    界面线程定期调用 drain() 一次性取走待显示的行批量插入控件。
+    待显示队列有上限，界面来不及刷新时丢弃最旧的行（完整日志仍在文件中）。
+
+    Args:
+        max_lines: 界面中保留的最大行数（待显示队列同样以此为上限）
+        log_file: 完整日志文件路径，None 表示不写文件
+        max_bytes: 单个日志文件的最大字节数，超过后滚动
+        backup_count: 保留的历史日志文件数
+    """
+
+    def __init__(self, max_lines=1000, log_file=LOG_FILE, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.max_lines = max_lines
+        self._pending = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._logger = None
+        if log_file:
+            self._logger = self._create_file_logger(log_file, max_bytes, backup_count)
+
+    @staticmethod
+    def _create_file_logger(log_file, max_bytes, backup_count):
+        try:
+            directory = os.path.dirname(log_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                          backupCount=backup_count, encoding='utf-8')
+        except OSError:
+            return None
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger = logging.getLogger(f"{__name__}.{id(handler)}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        return logger
+
+    def append(self, message, tag=None):
+        """添加一行日志（线程安全）"""
+        with self._lock:
+            self._pending.append((message, tag))
+        if self._logger:
+            try:
+                self._logger.info(message)
+            except Exception:
+                pass
+
+    def drain(self):
+        """取走所有待显示的 (message, tag)"""
+        with self._lock:
+            if not self._pending:
+                return []
+            lines = list(self._pending)
+            self._pending.clear()
+        return lines
+
+    def close(self):
+        if self._logger:
+            for handler in list(self._logger.handlers):
+                handler.close()
+                self._logger.removeHandler(handler)
+            self._logger = None
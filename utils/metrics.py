@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import app_path
+from utils.persistence import WriteCoalescer, append_lines, atomic_write
+
+METRICS_DIR = app_path("metrics")
+
+# 记录耗时的阶段
+PHASES = ("extract", "thumbnail", "download", "merge", "postprocess", "dedupe")
+
+
+class JobMetrics:
+    """
+    单个下载任务的耗时与流量统计
+
+    各阶段耗时以墙钟时间累计（同一阶段出现多次时相加），
+    下载阶段内部的 merge/postprocess 根据进度记录的 phase 切换自动划分。
+    """
+
+    def __init__(self, url, download_type):
+        self.url = url
+        self.download_type = download_type
+        self.started = time.time()
+        self.spans = {}
+        self.bytes_transferred = 0
+        self.peak_speed = 0.0
+        self.download_retries = 0  # yt-dlp 报告的重试
+        self.other_retries = 0     # 封面下载等其他环节的重试
+        self._phase = None
+        self._phase_start = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """统计 with 块的耗时"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._add(name, time.monotonic() - start)
+
+    def begin(self, phase):
+        """开始一个阶段（自动结束上一个阶段）"""
+        with self._lock:
+            self._end_locked()
+            self._phase = phase
+            self._phase_start = time.monotonic()
+
+    def end(self):
+        """结束当前阶段"""
+        with self._lock:
+            self._end_locked()
+
+    def observe(self, record):
+        """根据进度记录更新流量、峰值速度、重试次数和阶段"""
+        self.bytes_transferred = max(self.bytes_transferred, record.downloaded_bytes or 0)
+        if record.speed and record.speed > self.peak_speed:
+            self.peak_speed = record.speed
+        self.download_retries = record.retries
+        if record.phase != self._phase and self._phase in ("download", "merge", "postprocess"):
+            self.begin(record.phase)
+
+    def add_retry(self):
+        self.other_retries += 1
+
+    @property
+    def retries(self):
+        return self.download_retries + self.other_retries
+
+    def _add(self, name, seconds):
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def _end_locked(self):
+        if self._phase is not None:
+            elapsed = time.monotonic() - self._phase_start
+            self.spans[self._phase] = self.spans.get(self._phase, 0.0) + elapsed
+            self._phase = None
+
+    @property
+    def average_speed(self):
+        seconds = self.spans.get("download", 0.0)
+        return self.bytes_transferred / seconds if seconds > 0 else 0.0
+
+    def to_dict(self, state):
+        return {
+            "timestamp": datetime.fromtimestamp(self.started).strftime("%Y-%m-%d %H:%M:%S"),
+            "url": self.url,
+            "format": self.download_type,
+            "state": state,
+            "wall_seconds": round(time.time() - self.started, 3),
+            "spans": {k: round(v, 3) for k, v in self.spans.items()},
+            "bytes": self.bytes_transferred,
+            "avg_speed": round(self.average_speed, 1),
+            "peak_speed": round(self.peak_speed, 1),
+            "retries": self.retries,
+        }
+
+
+class MetricsRecorder:
+    """
+    汇总任务统计并导出
+
+    每个任务结束时追加一行到 JSON Lines 文件，同时累加进程内的汇总值
+    并重写 Prometheus 文本格式快照（可由 node_exporter 的 textfile
+    收集器抓取）。文件写入经过合并：短时间内结束的多个任务只追加一次、
+    重写一次快照。
+
+    Args:
+        metrics_dir: 输出目录
+        flush_interval_ms / flush_max_records: 合并写入的最长等待时间和最多记录数
+    """
+
+    def __init__(self, metrics_dir=METRICS_DIR, flush_interval_ms=500, flush_max_records=50):
+        self.jsonl_path = os.path.join(metrics_dir, "jobs.jsonl")
+        self.prom_path = os.path.join(metrics_dir, "metrics.prom")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._phase_sum = dict.fromkeys(PHASES, 0.0)
+        self._phase_count = dict.fromkeys(PHASES, 0)
+        self._bytes = 0
+        self._retries = 0
+        self._peak_speed = 0.0
+        self._writer = WriteCoalescer(self._flush, flush_interval_ms, flush_max_records, name="metrics")
+        try:
+            os.makedirs(metrics_dir, exist_ok=True)
+        except OSError:
+            pass
+
+    def record(self, metrics, state):
+        """记录一个结束的任务"""
+        metrics.end()
+        data = metrics.to_dict(state)
+        with self._lock:
+            key = (data["format"], state)
+            self._jobs[key] = self._jobs.get(key, 0) + 1
+            for phase, seconds in metrics.spans.items():
+                self._phase_sum[phase] = self._phase_sum.get(phase, 0.0) + seconds
+                self._phase_count[phase] = self._phase_count.get(phase, 0) + 1
+            self._bytes += metrics.bytes_transferred
+            self._retries += metrics.retries
+            self._peak_speed = max(self._peak_speed, metrics.peak_speed)
+        self._writer.add(json.dumps(data, ensure_ascii=False))
+        return data
+
+    def flush(self):
+        """立即写入尚未写入的记录"""
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
+
+    def _flush(self, lines):
+        try:
+            append_lines(self.jsonl_path, lines)
+            with self._lock:
+                text = self._prometheus_text()
+            # 原子替换快照文件，抓取方不会读到写了一半的内容
+            atomic_write(self.prom_path, text)
+        except OSError:
+            pass
+
+    def prometheus_text(self):
+        """生成 Prometheus 文本格式的汇总快照"""
+        with self._lock:
+            return self._prometheus_text()
+
+    def _prometheus_text(self):
+        lines = [
+            "# HELP ytdl_jobs_total Finished download jobs.",
+            "# TYPE ytdl_jobs_total counter",
+        ]
+        for (fmt, state), count in sorted(self._jobs.items()):
+            lines.append(f'ytdl_jobs_total{{format="{fmt}",state="{state}"}} {count}')
+        lines += [
+            "# HELP ytdl_phase_seconds Wall-clock time spent per job phase.",
+            "# TYPE ytdl_phase_seconds summary",
+        ]
+        for phase in sorted(self._phase_sum):
+            lines.append(f'ytdl_phase_seconds_sum{{phase="{phase}"}} {self._phase_sum[phase]:.3f}')
+            lines.append(f'ytdl_phase_seconds_count{{phase="{phase}"}} {self._phase_count[phase]}')
+        lines += [
+            "# HELP ytdl_bytes_total Bytes downloaded by finished jobs.",
+            "# TYPE ytdl_bytes_total counter",
+            f"ytdl_bytes_total {self._bytes}",
+            "# HELP ytdl_retries_total Download retries reported by yt-dlp and thumbnail fetches.",
+            "# TYPE ytdl_retries_total counter",
+            f"ytdl_retries_total {self._retries}",
+            "# HELP ytdl_peak_speed_bytes Highest download speed observed.",
+            "# TYPE ytdl_peak_speed_bytes gauge",
+            f"ytdl_peak_speed_bytes {self._peak_speed:.1f}",
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,88 @@
+import os
+import threading
+
+
+def _key(name):
+    # Windows 文件名不区分大小写
+    return os.path.normcase(name)
+
+
+class OutputIndex:
+    """
+    输出目录的文件名索引
+
+    首次使用时用 os.scandir 读取一次目录中的文件名，之后分配文件名只查内存中的集合，
+    不再每试一个序号就访问一次文件系统（目录中有大量文件或位于网络共享时很慢）。
+    同一目录的所有任务共享一个索引（见 get_output_index），在锁内分配，
+    并发任务不会得到同一个文件名。
+
+    索引建立后其他程序写入的文件：选定文件名后再检查一次该文件是否存在，
+    存在时登记并换下一个序号。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._names = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """读取目录中的文件名（需持有锁）"""
+        if self._names is not None:
+            return
+        names = set()
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    names.add(_key(entry.name))
+        except OSError:
+            pass  # 目录尚不存在
+        self._names = names
+
+    def reserve(self, filename):
+        """占用一个不重复的文件名（重复时添加 _1、_2 等序号），返回输出文件路径"""
+        base_name, ext = os.path.splitext(filename)
+        with self._lock:
+            self._load()
+            candidate = filename
+            counter = 0
+            # 已知的文件名只查集合；不在集合中的候选名访问一次文件系统确认
+            while (_key(candidate) in self._names
+                   or os.path.lexists(os.path.join(self.directory, candidate))):
+                self._names.add(_key(candidate))
+                counter += 1
+                candidate = f"{base_name}_{counter}{ext}"
+            self._names.add(_key(candidate))
+        return os.path.join(self.directory, candidate)
+
+    def add(self, path):
+        """登记已确定或新产生的文件（如恢复的任务沿用原文件名、下载的封面）"""
+        with self._lock:
+            self._load()
+            self._names.add(_key(os.path.basename(path)))
+
+    def release(self, path):
+        """任务失败且没有生成文件时释放文件名，重试时可以沿用（续传 .part 文件）"""
+        if os.path.lexists(path):
+            return
+        with self._lock:
+            if self._names is not None:
+                self._names.discard(_key(os.path.basename(path)))
+
+    def __contains__(self, filename):
+        with self._lock:
+            self._load()
+            return _key(filename) in self._names
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_output_index(directory):
+    """返回进程内共享的目录索引（单个下载和批量下载使用同一个）"""
+    key = _key(os.path.abspath(directory))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = OutputIndex(directory)
+        return index
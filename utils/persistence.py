@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+
+# 是否在替换文件前后调用 fsync：关闭时进程崩溃不会损坏文件，
+# 开启后断电也不会丢失已返回的写入（代价是每次写入等待磁盘）
+_fsync = False
+
+
+def set_fsync_policy(enabled):
+    global _fsync
+    _fsync = bool(enabled)
+
+
+def fsync_enabled():
+    return _fsync
+
+
+def _fsync_dir(directory):
+    """确保目录项（rename 结果）落盘；Windows 不支持打开目录，忽略"""
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data, fsync=None):
+    """
+    原子写入文件：写入同目录的临时文件后 os.replace 替换
+
+    读取方只会看到旧内容或完整的新内容，写入中途被终止也不会留下半个文件。
+
+    Args:
+        data: str（UTF-8）或 bytes
+        fsync: 是否落盘，None 表示使用全局策略
+    """
+    fsync = _fsync if fsync is None else fsync
+    directory = os.path.dirname(os.path.abspath(path))
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    # 临时文件名按进程和线程区分，并发写入同一文件时互不覆盖；
+    # 不用 mkstemp，新文件权限与普通 open 一致（受 umask 控制，而不是 0600）
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_dir(directory)
+
+
+def atomic_write_json(path, obj, fsync=None, **dump_kwargs):
+    dump_kwargs.setdefault('ensure_ascii', False)
+    atomic_write(path, json.dumps(obj, **dump_kwargs), fsync)
+
+
+def append_lines(path, lines, fsync=None):
+    """一次追加多行（只追加的日志类文件）"""
+    fsync = _fsync if fsync is None else fsync
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(line + '\n' for line in lines))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class WriteCoalescer:
+    """
+    合并写入
+
+    add() 只把条目放入缓冲区；缓冲的条目达到 max_items 条，或最早的条目
+    等待超过 max_delay_ms 毫秒时，调用 flush_func(条目列表) 一次写入。
+    批量下载中大量任务同时完成时，只产生一次写入而不是每个任务一次。
+
+    flush_func 总是串行调用，抛出的异常交给 on_error（默认忽略），
+    条目不会重试。进程退出前应调用 close()。
+
+    Args:
+        flush_func: flush_func(items)
+        max_delay_ms: 条目最长等待时间
+        max_items: 缓冲条目上限
+    """
+
+    def __init__(self, flush_func, max_delay_ms=500, max_items=50, on_error=None, name="coalescer"):
+        self.flush_func = flush_func
+        self.max_delay = max(0, max_delay_ms) / 1000
+        self.max_items = max(1, int(max_items))
+        self.on_error = on_error
+        self.name = name
+        self._items = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._closed = False
+
+    def add(self, item):
+        with self._lock:
+            self._items.append(item)
+            full = len(self._items) >= self.max_items or self._closed or not self.max_delay
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.name = f"{self.name}-flush"
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """立即写入缓冲的条目"""
+        with self._flush_lock:
+            with self._lock:
+                items, self._items = self._items, []
+                timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+            if not items:
+                return
+            try:
+                self.flush_func(items)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+
+    def close(self):
+        """写入剩余条目，之后的 add() 立即写入"""
+        with self._lock:
+            self._closed = True
+        self.flush()
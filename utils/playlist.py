@@ -0,0 +1,82 @@
+import re
+
+from utils.urls import extract_video_id, VIDEO_ID_RE
+from utils.ydl_pool import get_pool
+
+# 需要展开为单个视频任务的链接（播放列表、频道）
+COLLECTION_PATTERNS = [
+    r'^https?://(www\.|m\.)?youtube\.com/playlist\?list=[a-zA-Z0-9_-]+',
+    r'^https?://(www\.|m\.)?youtube\.com/@[\w.-]+',
+    r'^https?://(www\.|m\.)?youtube\.com/(channel|c|user)/[\w.-]+',
+]
+
+# 展开时嵌套的最大层数（频道 -> 标签页 -> 视频）
+MAX_DEPTH = 3
+
+FLAT_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': 'in_playlist',
+    'lazy_playlist': True,
+    'retries': 3,
+    'socket_timeout': 30,
+    'http_headers': {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    }
+}
+
+
+def is_collection_url(url):
+    """判断链接是否为播放列表或频道"""
+    return any(re.match(pattern, url) for pattern in COLLECTION_PATTERNS)
+
+
+def video_url(video_id):
+    """生成规范的视频链接"""
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def iter_playlist_entries(url):
+    """
+    惰性展开播放列表/频道，逐个生成视频链接
+
+    使用平铺提取（不解析每个视频的详细信息），并按页获取条目，
+    调用方可以在后续条目仍在获取时开始下载已得到的视频。
+
+    Yields:
+        (视频链接, 标题)
+    """
+    with get_pool().checkout(FLAT_OPTS) as ydl:
+        yield from _expand(ydl, url, 0)
+
+
+def _expand(ydl, url, depth):
+    if depth > MAX_DEPTH:
+        return
+    result = ydl.extract_info(url, download=False, process=False)
+    # 跟随跳转（如频道首页跳转到视频标签页）
+    while result and result.get('_type') in ('url', 'url_transparent') and depth <= MAX_DEPTH:
+        video_id = extract_video_id(result.get('url', ''))
+        if video_id:
+            yield video_url(video_id), result.get('title') or ''
+            return
+        depth += 1
+        result = ydl.extract_info(result['url'], download=False, process=False)
+    if not result:
+        return
+
+    if result.get('_type', 'video') == 'video':
+        if result.get('id'):
+            yield video_url(result['id']), result.get('title') or ''
+        return
+
+    for entry in result.get('entries') or []:
+        if not entry:
+            continue
+        entry_id = entry.get('id') or ''
+        entry_url = entry.get('url') or entry.get('webpage_url') or ''
+        if VIDEO_ID_RE.match(entry_id) and entry.get('ie_key') in (None, 'Youtube'):
+            yield video_url(entry_id), entry.get('title') or ''
+        elif entry_url:
+            # 嵌套的播放列表/标签页
+            yield from _expand(ydl, entry_url, depth + 1)
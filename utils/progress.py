@@ -0,0 +1,107 @@
+import threading
+
+# 界面刷新频率：每秒10帧
+UPDATE_INTERVAL_MS = 100
+
+# 任务所处阶段
+PHASE_DOWNLOAD = "download"
+PHASE_MERGE = "merge"
+PHASE_POSTPROCESS = "postprocess"
+
+
+class ProgressRecord:
+    """
+    单个下载的数值进度
+
+    每次下载只创建一个实例，进度钩子原地更新字段，
+    格式化只在界面显示时进行。
+    """
+
+    __slots__ = ('phase', 'downloaded_bytes', 'total_bytes', 'total_estimated',
+                 'speed', 'eta', 'fragment_index', 'fragment_count', 'retries')
+
+    def __init__(self):
+        self.phase = PHASE_DOWNLOAD
+        self.downloaded_bytes = 0
+        self.total_bytes = None       # 字节；未知时为 None
+        self.total_estimated = False  # total_bytes 是否为估计值
+        self.speed = None             # 字节/秒
+        self.eta = None               # 秒
+        self.fragment_index = None
+        self.fragment_count = None
+        self.retries = 0              # yt-dlp 报告的重试次数
+
+    @property
+    def percent(self):
+        if self.phase != PHASE_DOWNLOAD:
+            return 100.0
+        if self.total_bytes:
+            return min(100.0, self.downloaded_bytes * 100.0 / self.total_bytes)
+        if self.fragment_count:
+            return min(100.0, (self.fragment_index or 0) * 100.0 / self.fragment_count)
+        return 0.0
+
+    def to_dict(self):
+        """数值进度（JSON 可序列化）"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['percent'] = round(self.percent, 1)
+        return data
+
+
+def format_size(num_bytes):
+    """1536 -> '1.50KiB'，None -> 'N/A'"""
+    if num_bytes is None:
+        return 'N/A'
+    size = float(num_bytes)
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.2f}{unit}"
+        size /= 1024
+
+
+def format_speed(speed):
+    return f"{format_size(speed)}/s" if speed is not None else 'N/A'
+
+
+def format_eta(seconds):
+    """125 -> '02:05'，3725 -> '1:02:05'"""
+    if seconds is None:
+        return 'N/A'
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+PHASE_LABELS = {
+    PHASE_DOWNLOAD: "下载中",
+    PHASE_MERGE: "合并中",
+    PHASE_POSTPROCESS: "后处理中",
+}
+
+
+class ProgressAggregator:
+    """
+    进度事件合并器
+
+    下载线程的进度钩子只把任务的 ProgressRecord 引用写入字典
+    （O(1)，不做解析、不分配新对象、不调度界面回调）；界面线程按固定帧率
+    调用 drain() 取走两帧之间有更新的任务统一刷新。
+    """
+
+    def __init__(self):
+        self._latest = {}
+        # 读取 self._latest 与写入之间可能被 drain() 换走字典，更新会丢失
+        self._lock = threading.Lock()
+
+    def update(self, key, record):
+        with self._lock:
+            self._latest[key] = record
+
+    def drain(self):
+        """取走自上次调用以来有更新的任务 {key: ProgressRecord}"""
+        with self._lock:
+            latest, self._latest = self._latest, {}
+        return latest
@@ -0,0 +1,116 @@
+import threading
+import time
+from datetime import datetime
+
+# 单次最长休眠时间（秒），保证限速调整能尽快生效
+MAX_SLEEP = 0.5
+
+
+def _parse_minutes(value):
+    """'HH:MM' -> 当天的分钟数"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class _Stream:
+    """一个正在进行的下载在限速器中的令牌桶"""
+
+    def __init__(self):
+        self.tokens = 0.0
+        self.last = time.monotonic()
+
+
+class BandwidthLimiter:
+    """
+    全局带宽限制器（令牌桶）
+
+    所有下载共享同一个上限，上限在已登记（正在传输数据）的下载之间平均分配，
+    每个下载按自己的份额补充令牌，令牌不足时在进度钩子中休眠。
+
+    Args:
+        limit: 上限（字节/秒），0 表示不限速
+        schedule: 时间段规则列表，如
+            [{"start": "22:00", "end": "07:00", "limit": 0}]
+            当前时间落在某个时间段内时使用该时间段的 limit（0 为不限速），
+            时间段可以跨越午夜
+    """
+
+    def __init__(self, limit=0, schedule=None):
+        self._lock = threading.Lock()
+        self._streams = set()
+        self.limit = 0
+        self.schedule = []
+        self.set_limit(limit)
+        self.set_schedule(schedule)
+
+    def set_limit(self, limit):
+        """调整上限，对正在进行的下载立即生效"""
+        self.limit = max(0, int(limit or 0))
+
+    def set_schedule(self, schedule):
+        rules = []
+        for rule in schedule or []:
+            try:
+                rules.append((_parse_minutes(rule['start']), _parse_minutes(rule['end']),
+                              max(0, int(rule.get('limit') or 0))))
+            except (KeyError, ValueError, AttributeError):
+                continue
+        self.schedule = rules
+
+    def current_limit(self, now=None):
+        """当前生效的上限（字节/秒），0 表示不限速"""
+        if self.schedule:
+            now = now or datetime.now()
+            minute = now.hour * 60 + now.minute
+            for start, end, limit in self.schedule:
+                if start <= end:
+                    inside = start <= minute < end
+                else:
+                    inside = minute >= start or minute < end
+                if inside:
+                    return limit
+        return self.limit
+
+    def register(self):
+        """登记一个开始传输数据的下载，返回其令牌桶"""
+        stream = _Stream()
+        with self._lock:
+            self._streams.add(stream)
+        return stream
+
+    def unregister(self, stream):
+        """下载结束或进入后处理阶段，不再参与分配"""
+        with self._lock:
+            self._streams.discard(stream)
+
+    def throttle(self, stream, nbytes):
+        """消耗 nbytes 个令牌，超出份额时阻塞等待"""
+        while True:
+            limit = self.current_limit()
+            if not limit:
+                stream.tokens = 0.0
+                stream.last = time.monotonic()
+                return
+            with self._lock:
+                share = limit / max(1, len(self._streams))
+            now = time.monotonic()
+            # 最多积攒1秒的令牌，避免空闲后突发
+            stream.tokens = min(share, stream.tokens + (now - stream.last) * share)
+            stream.last = now
+            if nbytes <= 0:
+                return
+            if stream.tokens >= nbytes:
+                stream.tokens -= nbytes
+                return
+            # 先用掉已有令牌，剩余部分等待补充
+            nbytes -= max(0.0, stream.tokens)
+            stream.tokens = 0.0
+            time.sleep(min(MAX_SLEEP, nbytes / share))
+
+
+_limiter = BandwidthLimiter()
+
+
+def get_limiter():
+    """返回所有下载共享的限速器"""
+    return _limiter
@@ -0,0 +1,324 @@
+import os
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+from strategies.factory import DownloadStrategyFactory
+from utils.urls import extract_video_id
+from utils.metrics import JobMetrics
+from utils.progress import PHASE_DOWNLOAD, PHASE_POSTPROCESS
+
+# 任务状态
+QUEUED = "queued"
+EXTRACTING = "extracting"
+DOWNLOADING = "downloading"
+POSTPROCESSING = "postprocessing"
+DONE = "done"
+FAILED = "failed"
+
+JOB_STATES = (QUEUED, EXTRACTING, DOWNLOADING, POSTPROCESSING, DONE, FAILED)
+FINAL_STATES = (DONE, FAILED)
+
+# 同一站点的不同域名归为同一主机，共享并发上限
+HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "m.youtube.com": "youtube.com",
+    "music.youtube.com": "youtube.com",
+}
+
+
+def normalize_host(url):
+    """提取用于并发限制的主机名"""
+    host = (urlparse(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return HOST_ALIASES.get(host, host)
+
+
+class DownloadJob:
+    """批量下载中的单个任务"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url, download_type, index=0):
+        self.job_id = next(self._ids)
+        self.url = url
+        self.download_type = download_type
+        self.index = index
+        self.host = normalize_host(url)
+        self.video_id = extract_video_id(url)
+        self.state = QUEUED
+        self.video_info = None
+        self.output_file = None
+        self.error = None
+        self.skipped = False  # 任务日志或下载历史显示已完成，本次跳过
+        self.record_fields = {}  # 策略提供的额外历史记录字段
+        self.metrics = JobMetrics(url, download_type)
+
+    @property
+    def title(self):
+        if self.video_info:
+            return self.video_info.get('title') or ''
+        return ''
+
+    def to_dict(self):
+        """任务状态摘要（JSON 可序列化）"""
+        return {
+            'job': self.job_id,
+            'index': self.index,
+            'url': self.url,
+            'format': self.download_type,
+            'state': self.state,
+            'title': self.title,
+            'output_file': self.output_file,
+            'error': self.error,
+            'skipped': self.skipped,
+        }
+
+
+class BatchScheduler:
+    """
+    批量下载任务调度器
+
+    固定大小的工作线程池从队列中取任务执行，同一主机同时运行的任务数
+    不超过 per_host_limit。每个任务依次经过：
+    queued -> extracting -> downloading -> postprocessing -> done/failed
+
+    Args:
+        prepare: prepare(job)，在 extracting 阶段调用，负责填充
+            job.video_info 和 job.output_file
+        finish: finish(job)，在 postprocessing 阶段结束时调用（写历史记录等）；
+            策略返回 Future 时在后处理完成后由后台线程调用
+        progress_callback: progress_callback(job, record)，record 为 ProgressRecord
+        on_update: on_update(job)，任务状态变化时调用
+        max_workers: 工作线程数
+        per_host_limit: 单个主机的最大并发任务数
+        journal: 可选的 JobJournal，记录任务状态以便中断后恢复
+        strategy_options: {下载类型: 策略构造参数}，如 {"mp4": {"concurrent_fragments": 4}}
+        metrics: 可选的 MetricsRecorder，任务结束时记录各阶段耗时和流量
+        archive: 可选的 DownloadArchive，提交时跳过历史记录中已下载的视频
+    """
+
+    def __init__(self, prepare, finish=None, progress_callback=None, on_update=None,
+                 max_workers=3, per_host_limit=2, journal=None, strategy_options=None,
+                 metrics=None, archive=None):
+        self.prepare = prepare
+        self.finish = finish
+        self.progress_callback = progress_callback
+        self.on_update = on_update
+        self.max_workers = max(1, int(max_workers))
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.journal = journal
+        self.strategy_options = strategy_options or {}
+        self.metrics = metrics
+        self.archive = archive
+
+        self.jobs = []
+        self._seen = {}
+        self._pending = deque()
+        self._active_hosts = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._cancelled = False
+        self._postprocessing = 0
+        self._workers = []
+        self._factory = DownloadStrategyFactory()
+
+    def submit(self, url, download_type):
+        """添加一个下载任务，返回 DownloadJob；同一视频同一格式重复提交时返回 None"""
+        if self._closed:
+            raise RuntimeError("调度器已关闭，无法继续添加任务")
+        job = DownloadJob(url, download_type)
+        key = (job.video_id or url, download_type)
+        # 任务日志和历史记录的查询（可能写入数据库、访问磁盘）不持有调度锁，
+        # 不阻塞工作线程取任务和其他线程提交
+        self._restore(job)
+        if job.state == QUEUED:
+            self._check_archive(job)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("调度器已关闭，无法继续添加任务")
+            if key in self._seen:
+                return None
+            self._seen[key] = job
+            job.index = len(self.jobs) + 1
+            self.jobs.append(job)
+            if job.state == QUEUED:
+                self._pending.append(job)
+                self._cond.notify_all()
+        self._record(job)
+        self._notify(job)
+        return job
+
+    def find(self, url, download_type):
+        """查找已提交的同一视频同一格式的任务"""
+        with self._cond:
+            return self._seen.get((extract_video_id(url) or url, download_type))
+
+    def _restore(self, job):
+        """根据任务日志恢复上次的状态"""
+        if not self.journal:
+            return
+        record = self.journal.lookup(job.url, job.download_type)
+        if not record or not record.get('output_file'):
+            return
+        if record.get('state') == DONE and os.path.exists(record['output_file']):
+            job.state = DONE
+            job.skipped = True
+        # 沿用原输出路径，yt-dlp 会从 .part 文件继续下载
+        job.output_file = record['output_file']
+
+    def _check_archive(self, job):
+        """历史记录显示已下载时直接标记为完成（只查询索引，不解析视频信息）"""
+        if not self.archive:
+            return
+        try:
+            path = self.archive.lookup(job.url, job.download_type)
+        except Exception:
+            return
+        if path:
+            job.state = DONE
+            job.skipped = True
+            job.output_file = path
+
+    def start(self):
+        """启动工作线程"""
+        for n in range(self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"batch-worker-{n + 1}")
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def close(self):
+        """不再接受新任务，队列取空后工作线程退出"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        """取消所有尚未开始的任务"""
+        with self._cond:
+            self._cancelled = True
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """等待所有工作线程和后台后处理结束"""
+        for worker in self._workers:
+            worker.join(timeout)
+        with self._cond:
+            self._cond.wait_for(lambda: self._postprocessing == 0 or self._cancelled, timeout)
+
+    def counts(self):
+        """按状态统计任务数"""
+        result = dict.fromkeys(JOB_STATES, 0)
+        with self._cond:
+            for job in self.jobs:
+                result[job.state] += 1
+        return result
+
+    def _next_job(self):
+        """取出第一个所在主机未达到并发上限的任务（需持有锁）"""
+        for job in self._pending:
+            if self._active_hosts.get(job.host, 0) < self.per_host_limit:
+                self._pending.remove(job)
+                self._active_hosts[job.host] = self._active_hosts.get(job.host, 0) + 1
+                return job
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._cancelled or (self._closed and not self._pending):
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._active_hosts[job.host] -= 1
+                    self._cond.notify_all()
+
+    def _run(self, job):
+        try:
+            self._set_state(job, EXTRACTING)
+            self.prepare(job)
+
+            self._set_state(job, DOWNLOADING)
+            job.metrics.begin(PHASE_DOWNLOAD)
+
+            def callback(record, job=job):
+                job.metrics.observe(record)
+                if self.progress_callback:
+                    self.progress_callback(job, record)
+            options = self.strategy_options.get(job.download_type, {})
+            strategy = self._factory.get_strategy(job.download_type, callback, **options)
+            info = job.video_info.get('info_dict') if job.video_info else None
+            result = strategy.download(job.url, job.output_file, info)
+            job.record_fields = dict(strategy.record_fields)
+
+            self._set_state(job, POSTPROCESSING)
+            if isinstance(result, Future):
+                # 后处理在后台进行，工作线程继续下载下一个任务
+                job.metrics.begin(PHASE_POSTPROCESS)
+                with self._cond:
+                    self._postprocessing += 1
+                result.add_done_callback(lambda future, job=job: self._postprocess_done(job, future))
+                return
+            self._complete(job)
+        except Exception as e:
+            self._fail(job, e)
+
+    def _postprocess_done(self, job, future):
+        try:
+            error = future.exception()
+            if error is not None:
+                self._fail(job, error)
+            else:
+                self._complete(job)
+        finally:
+            with self._cond:
+                self._postprocessing -= 1
+                self._cond.notify_all()
+
+    def _complete(self, job):
+        try:
+            if self.finish:
+                self.finish(job)
+            self._set_state(job, DONE)
+        except Exception as e:
+            self._fail(job, e)
+
+    def _fail(self, job, error):
+        job.error = str(error)
+        self._set_state(job, FAILED)
+
+    def _set_state(self, job, state):
+        job.state = state
+        if state in FINAL_STATES and self.metrics:
+            try:
+                self.metrics.record(job.metrics, state)
+            except Exception:
+                pass
+        self._record(job)
+        self._notify(job)
+
+    def _record(self, job):
+        if self.journal:
+            try:
+                self.journal.record(job)
+            except Exception:
+                pass
+
+    def _notify(self, job):
+        if self.on_update:
+            try:
+                self.on_update(job)
+            except Exception:
+                pass
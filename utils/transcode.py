@@ -0,0 +1,129 @@
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 处理方式（写入历史记录）
+AUDIO_COPY = "copy"            # 源文件即为目标格式，原样保留
+AUDIO_REMUX = "remux"          # 编码一致，仅更换容器（-c:a copy）
+AUDIO_TRANSCODE = "transcode"  # 需要重新编码
+
+# 目标格式: (可直接复制的源编码前缀, 转码编码器, 码率, ffmpeg 输出格式)
+AUDIO_TARGETS = {
+    'mp3': (('mp3',), 'libmp3lame', '192k', 'mp3'),
+    'm4a': (('mp4a', 'aac'), 'aac', '192k', 'ipod'),
+    'opus': (('opus',), 'libopus', '160k', 'opus'),
+}
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def plan_audio(source_path, source_codec, target_path, target_format):
+    """
+    决定音频的处理方式
+
+    Returns:
+        (处理方式, 编码器, 码率, ffmpeg 输出格式)
+    """
+    copy_codecs, codec, bitrate, output_format = AUDIO_TARGETS[target_format]
+    source_codec = (source_codec or '').lower()
+    if source_codec.startswith(copy_codecs):
+        if os.path.abspath(source_path) == os.path.abspath(target_path):
+            return AUDIO_COPY, None, None, output_format
+        return AUDIO_REMUX, 'copy', None, output_format
+    return AUDIO_TRANSCODE, codec, bitrate, output_format
+
+
+class TranscodePool:
+    """
+    独立的音频转码阶段
+
+    下载线程把已下载的源文件交给转码池后立即继续下一个下载，
+    转码在后台并行进行。每个转码任务运行一个独立的 ffmpeg 进程，
+    并发数默认等于 CPU 核数。
+
+    Args:
+        max_workers: 同时运行的 ffmpeg 进程数，None 或 0 表示 CPU 核数
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="transcode")
+        self._processes = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, source, target, codec='libmp3lame', bitrate='192k', output_format='mp3'):
+        """提交转码任务（codec 为 'copy' 时只更换容器），返回 Future，结果为输出文件路径"""
+        return self._executor.submit(self._transcode, source, target, codec, bitrate, output_format)
+
+    def _transcode(self, source, target, codec, bitrate, output_format):
+        if self._closed:
+            raise TranscodeError("转码池已关闭")
+        ffmpeg = shutil.which('ffmpeg')
+        if not ffmpeg:
+            raise TranscodeError("未找到 ffmpeg，无法转码")
+        tmp_target = f"{target}.tmp"
+        cmd = [ffmpeg, '-y', '-nostdin', '-loglevel', 'error', '-i', source, '-vn', '-c:a', codec]
+        if bitrate and codec != 'copy':
+            cmd += ['-b:a', bitrate]
+        cmd += ['-f', output_format, tmp_target]
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        )
+        with self._lock:
+            if self._closed:
+                process.kill()
+            self._processes.add(process)
+        try:
+            _, stderr = process.communicate()
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+        if process.returncode != 0:
+            try:
+                os.remove(tmp_target)
+            except OSError:
+                pass
+            message = stderr.decode('utf-8', 'replace').strip().splitlines()
+            raise TranscodeError(f"ffmpeg 转码失败: {message[-1] if message else process.returncode}")
+        os.replace(tmp_target, target)
+        if os.path.abspath(source) != os.path.abspath(target):
+            try:
+                os.remove(source)
+            except OSError:
+                pass
+        return target
+
+    def shutdown(self):
+        """停止接收任务并终止正在运行的 ffmpeg 进程"""
+        with self._lock:
+            self._closed = True
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                process.kill()
+            except Exception:
+                pass
+        self._executor.shutdown(wait=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_transcode_pool(max_workers=None):
+    """返回共享的转码池（首次调用时按 max_workers 创建）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = TranscodePool(max_workers)
+        return _pool
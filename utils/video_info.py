@@ -0,0 +1,197 @@
+import os
+import re
+import ssl
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+from strategies.factory import AUDIO_FORMATS
+from utils.urls import extract_video_id
+from utils.ydl_pool import get_pool
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+VIDEO_INFO_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'retries': 3,
+    'fragment_retries': 3,
+    'socket_timeout': 30,
+    'http_headers': {
+        'User-Agent': USER_AGENT
+    }
+}
+
+
+def print_log(message, color=None):
+    print(message)
+
+
+def clean_filename(name):
+    """清理文件名中的非法字符并限制长度"""
+    if not name:
+        return ''
+    # 移除或替换非法字符
+    name = re.sub(r'[<>:"/\|?*]', '_', name)
+    # 限制长度
+    return name[:50] if len(name) > 50 else name
+
+
+def build_video_info(info):
+    """由 yt-dlp 的信息字典生成显示信息和文件名"""
+    title = info.get('title', '')
+    uploader = info.get('uploader', '')
+    height = info.get('height') or 0
+    ext = info.get('ext', 'mp4')
+
+    # 对于视频文件，默认使用mp4格式
+    if ext in ['webm', 'mkv', 'flv']:
+        ext = 'mp4'
+
+    clean_title = clean_filename(title)
+    clean_uploader = clean_filename(uploader)
+
+    # 生成文件名
+    if clean_title:
+        if clean_uploader:
+            if height > 0:
+                filename = f"{clean_title}_{clean_uploader}_{height}p.{ext}"
+            else:
+                filename = f"{clean_title}_{clean_uploader}.{ext}"
+        else:
+            if height > 0:
+                filename = f"{clean_title}_{height}p.{ext}"
+            else:
+                filename = f"{clean_title}.{ext}"
+    else:
+        # 没有标题时使用时间格式
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"video_{timestamp}.{ext}"
+
+    return {
+        'title': title,
+        'uploader': uploader,
+        'height': height,
+        'ext': ext,
+        'filename': filename,
+        'thumbnail': info.get('thumbnail'),  # 封面链接
+        'info_dict': info  # 完整信息，供下载策略直接使用，避免重复解析
+    }
+
+
+def fallback_video_info():
+    """获取信息失败时使用的默认文件名"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return {
+        'title': '',
+        'uploader': '',
+        'height': 0,
+        'ext': 'mp4',
+        'filename': f"video_{timestamp}.mp4",
+        'thumbnail': None,
+        'info_dict': None
+    }
+
+
+def get_video_info(url, cache=None, log=print_log):
+    """
+    获取视频信息
+
+    Args:
+        url: 视频链接
+        cache: 可选的 MetadataCache，命中时跳过解析
+        log: log(message, color=None)，用于输出错误信息
+    """
+    try:
+        # 优先使用缓存的信息，命中时跳过解析
+        video_id = extract_video_id(url)
+        info = cache.get(video_id) if cache and video_id else None
+        if info is None:
+            with get_pool().checkout(VIDEO_INFO_OPTS) as ydl:
+                info = ydl.extract_info(url, download=False)
+                info = ydl.sanitize_info(info)
+            # 仅缓存单个视频（带 list 参数的链接可能解析为播放列表）
+            if cache and video_id and info.get('id') == video_id and info.get('_type', 'video') == 'video':
+                cache.put(video_id, info)
+        return build_video_info(info)
+    except Exception as e:
+        log(f"[错误] 获取视频信息失败: {e}")
+        # 如果获取信息失败，使用默认文件名
+        return fallback_video_info()
+
+
+def output_filename(video_info, download_type):
+    """根据下载格式调整文件名"""
+    if download_type in AUDIO_FORMATS:
+        return video_info['filename'].rsplit('.', 1)[0] + f'.{download_type}'
+    return video_info['filename']
+
+
+def download_thumbnail(video_info, output_dir, log=print_log, metrics=None):
+    """
+    下载视频封面
+
+    Args:
+        metrics: 可选的 JobMetrics，记录耗时和重试次数
+
+    Returns:
+        封面文件路径，失败时返回 None
+    """
+    if metrics is not None:
+        with metrics.span("thumbnail"):
+            return _download_thumbnail(video_info, output_dir, log, metrics)
+    return _download_thumbnail(video_info, output_dir, log)
+
+
+def _download_thumbnail(video_info, output_dir, log, metrics=None):
+    try:
+        thumbnail_url = video_info.get('thumbnail')
+        if not thumbnail_url:
+            log("[警告] 未找到封面链接")
+            return None
+
+        # 确保输出目录存在
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+            log(f"[信息] 创建下载目录: {output_dir}")
+
+        # 生成封面文件名
+        base_filename = video_info['filename'].rsplit('.', 1)[0]  # 移除扩展名
+        thumbnail_filename = f"{base_filename}.png"
+        thumbnail_path = os.path.join(output_dir, thumbnail_filename)
+
+        log(f"[封面] 开始下载封面: {thumbnail_filename}")
+
+        # 创建不验证SSL证书的上下文
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+
+        # 下载封面，添加重试机制
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                request = urllib.request.Request(
+                    thumbnail_url,
+                    headers={'User-Agent': USER_AGENT}
+                )
+
+                with urllib.request.urlopen(request, context=ssl_context, timeout=30) as response:
+                    with open(thumbnail_path, 'wb') as f:
+                        f.write(response.read())
+
+                log(f"[成功] 封面下载完成: {thumbnail_filename}")
+                return thumbnail_path
+
+            except (urllib.error.URLError, ssl.SSLError, TimeoutError) as e:
+                if attempt < max_retries - 1:
+                    if metrics is not None:
+                        metrics.add_retry()
+                    log(f"[重试] 封面下载失败，第{attempt + 1}次重试: {e}")
+                    continue
+                else:
+                    raise e
+
+    except Exception as e:
+        log(f"[错误] 封面下载失败: {e}")
+        return None
@@ -0,0 +1,173 @@
+import json
+import sys
+import threading
+from contextlib import contextmanager
+
+import yt_dlp
+
+
+class _HookRelay:
+    """
+    固定注册在 YoutubeDL 实例上的钩子
+
+    实例在多次下载之间复用，每次借出时只替换转发目标，
+    无需修改 yt-dlp 内部的钩子列表。
+    """
+
+    def __init__(self):
+        self.target = None
+
+    def __call__(self, d):
+        target = self.target
+        if target is not None:
+            target(d)
+
+
+class _LoggerRelay:
+    """
+    固定注册在 YoutubeDL 实例上的 logger
+
+    输出按 (级别, 消息) 转发给当前借用者的 log_hook；
+    没有借用者时丢弃普通输出，警告和错误写到 stderr。
+    """
+
+    def __init__(self):
+        self.target = None
+
+    def _emit(self, level, msg):
+        target = self.target
+        if target is not None:
+            target(level, msg)
+        elif level in ('warning', 'error') and sys.stderr is not None:
+            print(msg, file=sys.stderr)
+
+    def debug(self, msg):
+        self._emit('debug', msg)
+
+    def info(self, msg):
+        self._emit('info', msg)
+
+    def warning(self, msg):
+        self._emit('warning', msg)
+
+    def error(self, msg):
+        self._emit('error', msg)
+
+
+class _PooledEntry:
+    def __init__(self, ydl, progress_relay, postprocessor_relay, logger_relay):
+        self.ydl = ydl
+        self.progress_relay = progress_relay
+        self.postprocessor_relay = postprocessor_relay
+        self.logger_relay = logger_relay
+
+
+class YoutubeDLPool:
+    """
+    按选项配置复用的 YoutubeDL 实例池
+
+    相同选项（不含输出路径、进度钩子和日志钩子）的下载共享长期存在的实例，
+    避免每个链接重复初始化提取器、Cookie 和 HTTP 连接。
+    每个实例同一时间只借给一个线程使用。
+
+    用法：
+        with pool.checkout(ydl_opts, outtmpl=path, progress_hook=hook,
+                           postprocessor_hook=pp_hook) as ydl:
+            ydl.download([url])
+    """
+
+    def __init__(self, max_idle_per_profile=4):
+        self.max_idle_per_profile = max_idle_per_profile
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def _profile_key(ydl_opts):
+        return json.dumps(ydl_opts, sort_keys=True, default=repr)
+
+    def _create(self, ydl_opts):
+        relay = _HookRelay()
+        pp_relay = _HookRelay()
+        opts = dict(ydl_opts)
+        opts['progress_hooks'] = list(opts.get('progress_hooks', [])) + [relay]
+        opts['postprocessor_hooks'] = list(opts.get('postprocessor_hooks', [])) + [pp_relay]
+        logger_relay = _LoggerRelay()
+        opts.setdefault('logger', logger_relay)
+        return _PooledEntry(yt_dlp.YoutubeDL(opts), relay, pp_relay, logger_relay)
+
+    @contextmanager
+    def checkout(self, ydl_opts, outtmpl=None, progress_hook=None, postprocessor_hook=None,
+                 log_hook=None):
+        """
+        借出一个与 ydl_opts 对应的实例，退出上下文时归还
+
+        log_hook(level, msg) 接收 yt-dlp 的输出（level 为 debug/info/warning/error）
+        """
+        key = self._profile_key(ydl_opts)
+        with self._lock:
+            idle = self._idle.get(key)
+            entry = idle.pop() if idle else None
+        if entry is None:
+            entry = self._create(ydl_opts)
+
+        ydl = entry.ydl
+        default_outtmpl = ydl.params['outtmpl'].get('default')
+        if outtmpl is not None:
+            ydl.params['outtmpl']['default'] = outtmpl
+        entry.progress_relay.target = progress_hook
+        entry.postprocessor_relay.target = postprocessor_hook
+        entry.logger_relay.target = log_hook
+
+        ok = False
+        try:
+            yield ydl
+            ok = True
+        finally:
+            entry.progress_relay.target = None
+            entry.postprocessor_relay.target = None
+            entry.logger_relay.target = None
+            ydl.params['outtmpl']['default'] = default_outtmpl
+            # 出错的实例可能处于异常状态，直接丢弃
+            if ok:
+                self._release(key, entry)
+            else:
+                self._close_entry(entry)
+
+    def _release(self, key, entry):
+        with self._lock:
+            if not self._closed:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_profile:
+                    idle.append(entry)
+                    return
+        self._close_entry(entry)
+
+    @staticmethod
+    def _close_entry(entry):
+        try:
+            entry.ydl.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """关闭所有空闲实例（保存 Cookie、释放连接）"""
+        with self._lock:
+            self._closed = True
+            entries = [e for idle in self._idle.values() for e in idle]
+            self._idle.clear()
+        for entry in entries:
+            self._close_entry(entry)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """返回进程内共享的实例池"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None or _default_pool._closed:
+            _default_pool = YoutubeDLPool()
+        return _default_pool